@@ -19,12 +19,12 @@ from kicad_svg_extras.colors import (
     net_layer_to_css_class,
     net_name_to_css_class,
     parse_color,
-    resolve_net_color,
+    resolve_net_colors,
 )
 from kicad_svg_extras.layers import (
     get_copper_layers,
-    get_non_copper_layers,
     parse_layer_list,
+    partition_copper_layers,
     validate_layers,
 )
 from kicad_svg_extras.log_setup import setup_logging
@@ -320,11 +320,10 @@ def main():
     net_names = svg_generator.get_net_names(Path(args.pcb_file))
 
     # Resolve colors for nets with user-provided configuration only
-    resolved_net_colors = {}
+    resolved_net_colors = resolve_net_colors(net_names, net_colors_config)
     for net_name in net_names:
-        color = resolve_net_color(net_name, net_colors_config)
-        if color:  # Only include nets with user-defined colors
-            resolved_net_colors[net_name] = color
+        color = resolved_net_colors.get(net_name)
+        if color:  # Only nets with user-defined colors are included
             logger.debug(f"Resolved color for net '{net_name}': {color}")
         else:
             logger.debug(
@@ -349,8 +348,7 @@ def main():
         sys.exit(1)
 
     # Separate copper and non-copper layers
-    copper_layers = get_copper_layers(layer_list)
-    non_copper_layers = get_non_copper_layers(layer_list)
+    copper_layers, non_copper_layers = partition_copper_layers(layer_list)
 
     if not copper_layers:
         logger.error("At least one copper layer must be specified")
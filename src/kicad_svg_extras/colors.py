@@ -4,13 +4,16 @@
 """Color management for KiCad SVG generation."""
 
 import fnmatch
+import functools
 import json
 import logging
+import os
 import re
 import shutil
 import xml.etree.ElementTree as ET
+from collections.abc import Callable, Iterable, Iterator
 from pathlib import Path
-from typing import Optional
+from typing import Optional, TextIO, Union
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +24,61 @@ DEFAULT_BACKGROUND_LIGHT = "#FFFFFF"
 # Color validation constants
 MAX_RGB_VALUE = 255
 
+# Color format patterns, compiled once instead of on every call
+# Hex format: #RRGGBB or #RRGGBBAA
+HEX_COLOR_RE = re.compile(r"^#[0-9A-Fa-f]{6}([0-9A-Fa-f]{2})?$")
+# Hex format without alpha: #RRGGBB (use with fullmatch)
+HEX_RGB_COLOR_RE = re.compile(r"#[0-9A-Fa-f]{6}")
+# RGB format: rgb(255, 0, 255) - exactly 3 values (use with fullmatch).
+# ASCII mode limits \d to 0-9 and skips Unicode digit category lookups
+RGB_COLOR_RE = re.compile(r"rgb\s*\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)", re.ASCII)
+# RGBA format: rgba(255, 0, 255, 1.0) - exactly 4 values (use with fullmatch)
+RGBA_COLOR_RE = re.compile(
+    r"rgba\s*\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*[\d.]+\s*\)", re.ASCII
+)
+
+# SVG style attribute patterns
+STYLE_FILL_COLOR_RE = re.compile(r"fill:\s*#([0-9A-Fa-f]{6})")
+STYLE_FILL_RE = re.compile(r"fill:\s*[^;]+;?")
+STYLE_STROKE_RE = re.compile(r"stroke:\s*[^;]+;?")
+STYLE_EMPTY_DECLARATION_RE = re.compile(r";\s*;")
+
+# Net name characters not valid in CSS identifiers and their replacements,
+# applied with a single str.translate call
+CSS_CLASS_TRANSLATION = str.maketrans(
+    {
+        "/": "-",
+        "\\": "-",
+        "(": "-",
+        ")": "-",
+        " ": "-",
+        ".": "-",
+        "_": "-",
+        "{": "-",
+        "}": "-",
+        ":": "-",
+        "<": "",
+        ">": "",
+        "$": "",  # $ is not valid in CSS identifiers
+        "+": "plus",  # + is not valid, replace with word
+        "=": "eq",  # = is not valid, replace with word
+        "@": "at",  # @ is not valid, replace with word
+        "#": "hash",  # # is not valid, replace with word
+        "%": "pct",  # % is not valid, replace with word
+        "&": "and",  # & is not valid, replace with word
+        "*": "star",  # * is not valid, replace with word
+        "!": "not",  # ! is not valid, replace with word
+        "?": "q",  # ? is not valid, replace with word
+        "~": "tilde",  # ~ is not valid, replace with word
+        "^": "hat",  # ^ is not valid, replace with word
+    }
+)
+CSS_INVALID_CHARS_RE = re.compile(r"[^a-z0-9_-]")
+CSS_REPEATED_SEPARATORS_RE = re.compile(r"[-_]{2,}")
+
+# Size of text blocks in which SVG files are rewritten when changing colors
+COLOR_REPLACE_CHUNK_SIZE = 64 * 1024
+
 # Non-copper colors to exclude during auto-detection
 NON_COPPER_COLORS = frozenset(
     [
@@ -92,40 +150,47 @@ def parse_color(color_value: str) -> str:
         msg = f"Color value must be a string, got {type(color_value)}"
         raise ColorError(msg)
 
+    return _parse_color_string(color_value)
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_color_string(color_value: str) -> str:
+    """Parse color string, see parse_color.
+
+    Configurations tend to repeat the same few color values, so results are
+    cached. Invalid values raise ColorError every time (exceptions are not
+    cached).
+    """
     color_value = color_value.strip()
     if not color_value:
         msg = "Color value cannot be empty"
         raise ColorError(msg)
 
     # Already hex format: #RRGGBB or #RRGGBBAA
-    if re.match(r"^#[0-9A-Fa-f]{6}([0-9A-Fa-f]{2})?$", color_value):
+    if HEX_COLOR_RE.match(color_value):
         return color_value.upper()[:7]  # Return only RGB part, uppercase
 
     # RGB format: rgb(255, 0, 255) - exactly 3 values
-    rgb_match = re.match(
-        r"^rgb\s*\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\)$",
-        color_value,
-    )
+    rgb_match = RGB_COLOR_RE.fullmatch(color_value)
     # RGBA format: rgba(255, 0, 255, 1.0) - exactly 4 values
-    rgba_match = re.match(
-        r"^rgba\s*\(\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*,\s*[\d.]+\s*\)$",
-        color_value,
-    )
+    rgba_match = RGBA_COLOR_RE.fullmatch(color_value)
     if rgb_match or rgba_match:
         match = rgb_match if rgb_match else rgba_match
         if match is None:  # This should never happen but satisfies mypy
             msg = "Internal error: regex match is None"
             raise ColorError(msg)
         r, g, b = [int(val) for val in match.groups()]
-        # Validate RGB values
-        if not all(0 <= val <= MAX_RGB_VALUE for val in (r, g, b)):
+        # Validate RGB values. They are non-negative (digits only), so all of
+        # them are in range exactly when their bitwise OR is
+        if (r | g | b) > MAX_RGB_VALUE:
             msg = f"RGB values must be between 0-{MAX_RGB_VALUE}, got ({r}, {g}, {b})"
             raise ColorError(msg)
-        return f"#{r:02X}{g:02X}{b:02X}"
+        return "#" + bytes((r, g, b)).hex().upper()
 
     # Named colors
-    if color_value.lower() in NAMED_COLORS:
-        return NAMED_COLORS[color_value.lower()]
+    named_color = NAMED_COLORS.get(color_value.lower())
+    if named_color is not None:
+        return named_color
 
     # If we can't parse it, raise an error
     msg = f"Invalid color format: '{color_value}'"
@@ -141,9 +206,9 @@ def validate_hex_color(hex_color: str) -> bool:
     Returns:
         True if valid hex color, False otherwise
     """
-    if not isinstance(hex_color, str):
-        return False
-    return bool(re.match(r"^#[0-9A-Fa-f]{6}$", hex_color))
+    return (
+        isinstance(hex_color, str) and HEX_RGB_COLOR_RE.fullmatch(hex_color) is not None
+    )
 
 
 def load_color_config(config_file: Path) -> dict[str, str]:
@@ -159,9 +224,9 @@ def load_color_config(config_file: Path) -> dict[str, str]:
         ColorError: If file cannot be loaded or parsed
     """
     try:
-        with open(config_file) as f:
-            data = json.load(f)
-    except (OSError, json.JSONDecodeError) as e:
+        # Parse raw bytes, JSON decoder detects UTF-8/16/32 encoding itself
+        data = json.loads(Path(config_file).read_bytes())
+    except (OSError, UnicodeDecodeError, json.JSONDecodeError) as e:
         msg = f"Failed to load color configuration from {config_file}: {e}"
         raise ColorError(msg) from e
 
@@ -222,6 +287,66 @@ def load_color_config(config_file: Path) -> dict[str, str]:
     return converted_colors
 
 
+def _is_wildcard_pattern(pattern: str) -> bool:
+    """Check if net pattern contains any fnmatch wildcards."""
+    return "*" in pattern or "?" in pattern or "[" in pattern
+
+
+@functools.lru_cache(maxsize=1024)
+def _net_pattern_matcher(pattern: str) -> Callable[[str], object]:
+    """Get function matching normalized net names like fnmatch.fnmatch.
+
+    Patterns repeat for every net being resolved, so matchers are built once
+    per pattern. The common PREFIX* and *SUFFIX forms are matched with plain
+    string comparison, other patterns are translated to compiled regex.
+    """
+    normalized = os.path.normcase(pattern)
+    if normalized.endswith("*") and not _is_wildcard_pattern(normalized[:-1]):
+        prefix = normalized[:-1]
+        return lambda name: name.startswith(prefix)
+    if normalized.startswith("*") and not _is_wildcard_pattern(normalized[1:]):
+        suffix = normalized[1:]
+        return lambda name: name.endswith(suffix)
+    return re.compile(fnmatch.translate(normalized)).match
+
+
+def _prepare_net_patterns(
+    net_colors_config: dict[str, str],
+) -> list[tuple[Callable[[str], object], str]]:
+    """Get wildcard pattern matchers of configuration with their colors.
+
+    Patterns are sorted by specificity (longer patterns first).
+    """
+    wildcard_patterns = [
+        pattern for pattern in net_colors_config if _is_wildcard_pattern(pattern)
+    ]
+    wildcard_patterns.sort(key=len, reverse=True)
+    return [
+        (_net_pattern_matcher(pattern), net_colors_config[pattern])
+        for pattern in wildcard_patterns
+    ]
+
+
+def _match_net_color(
+    net_name: str,
+    net_colors_config: dict[str, str],
+    net_patterns: list[tuple[Callable[[str], object], str]],
+) -> Optional[str]:
+    """Get the color for a given net name using prepared wildcard patterns."""
+    # Exact match first
+    if net_name in net_colors_config:
+        return net_colors_config[net_name]
+
+    # Wildcard matches
+    normalized_name = os.path.normcase(net_name)
+    for matches, color in net_patterns:
+        if matches(normalized_name):
+            return color
+
+    # No user-defined color found
+    return None
+
+
 def resolve_net_color(
     net_name: str, net_colors_config: dict[str, str]
 ) -> Optional[str]:
@@ -238,20 +363,36 @@ def resolve_net_color(
     if not net_colors_config:
         return None
 
-    # Exact match first
-    if net_name in net_colors_config:
-        return net_colors_config[net_name]
+    net_patterns = _prepare_net_patterns(net_colors_config)
+    return _match_net_color(net_name, net_colors_config, net_patterns)
 
-    # Wildcard matches
-    # Sort patterns by specificity (longer patterns first)
-    sorted_patterns = sorted(net_colors_config.keys(), key=len, reverse=True)
-    for pattern in sorted_patterns:
-        if "*" in pattern or "?" in pattern or "[" in pattern:
-            if fnmatch.fnmatch(net_name, pattern):
-                return net_colors_config[pattern]
 
-    # No user-defined color found
-    return None
+def resolve_net_colors(
+    net_names: list[str], net_colors_config: dict[str, str]
+) -> dict[str, str]:
+    """Get the colors for multiple nets, supporting wildcards.
+
+    Same as calling resolve_net_color for each net, but the wildcard patterns
+    of the configuration are prepared only once.
+
+    Args:
+        net_names: Names of the nets
+        net_colors_config: Configuration mapping net patterns to colors
+
+    Returns:
+        Dictionary mapping net names to hex colors, for nets with a color only
+    """
+    # Only apply colors if user provided configuration
+    if not net_colors_config:
+        return {}
+
+    net_patterns = _prepare_net_patterns(net_colors_config)
+    resolved_colors = {}
+    for net_name in net_names:
+        color = _match_net_color(net_name, net_colors_config, net_patterns)
+        if color:
+            resolved_colors[net_name] = color
+    return resolved_colors
 
 
 def group_nets_by_color(
@@ -271,52 +412,57 @@ def group_nets_by_color(
     color_groups: dict[str, list[str]] = {}
     default_nets = []
 
+    resolved_colors = resolve_net_colors(net_names, net_colors)
     for net_name in net_names:
-        color = resolve_net_color(net_name, net_colors)
+        color = resolved_colors.get(net_name)
         if color:
-            if color not in color_groups:
-                color_groups[color] = []
-            color_groups[color].append(net_name)
+            color_groups.setdefault(color, []).append(net_name)
         else:
             default_nets.append(net_name)
 
     return color_groups, default_nets
 
 
-def find_copper_color_in_svg(svg_file: Path) -> Optional[str]:
+def find_copper_color_in_svg(svg_file: Union[Path, TextIO]) -> Optional[str]:
     """Automatically detect copper color in SVG file.
 
     Args:
-        svg_file: Path to SVG file
+        svg_file: Path to SVG file or file-like object with SVG content
 
     Returns:
         Detected copper color as hex string, or None if not found
     """
+    # Look for fill colors in the SVG (both fill attribute and style attribute).
+    # Elements are checked as soon as their start tag is parsed (in document
+    # order), so parsing stops at the first match, and elements are cleared
+    # once complete so that memory use does not grow with file size
     try:
-        tree = ET.parse(svg_file)
-        root = tree.getroot()
+        for event, elem in ET.iterparse(svg_file, events=("start", "end")):
+            if event == "end":
+                elem.clear()
+                continue
+
+            # Check fill attribute
+            fill: Optional[str] = elem.get("fill")
+            if fill and HEX_RGB_COLOR_RE.fullmatch(fill):
+                # Normalize case once, NON_COPPER_COLORS holds uppercase colors
+                fill = fill.upper()
+                if fill not in NON_COPPER_COLORS:
+                    return fill
+
+            # Check style attribute for fill colors
+            style = elem.get("style", "")
+            if "fill:" in style:
+                # Extract fill color from style using regex
+                fill_match = STYLE_FILL_COLOR_RE.search(style)
+                if fill_match:
+                    color = "#" + fill_match.group(1).upper()
+                    if color not in NON_COPPER_COLORS:
+                        return color
     except (ET.ParseError, FileNotFoundError, OSError) as e:
         logger.warning(f"Failed to read or parse SVG file {svg_file}: {e}")
         return None
 
-    # Look for fill colors in the SVG (both fill attribute and style attribute)
-    for elem in root.iter():
-        # Check fill attribute
-        fill = elem.get("fill")
-        if fill and fill not in NON_COPPER_COLORS:
-            if re.match(r"^#[0-9A-Fa-f]{6}$", fill):
-                return fill.upper()
-
-        # Check style attribute for fill colors
-        style = elem.get("style", "")
-        if "fill:" in style:
-            # Extract fill color from style using regex
-            fill_match = re.search(r"fill:\s*#([0-9A-Fa-f]{6})", style)
-            if fill_match:
-                color = "#" + fill_match.group(1)
-                if color.upper() not in NON_COPPER_COLORS:
-                    return color.upper()
-
     return None
 
 
@@ -341,13 +487,6 @@ def change_svg_color(
         msg = f"Invalid new color format: {new_color}"
         raise ColorError(msg)
 
-    try:
-        with open(svg_file) as f:
-            content = f.read()
-    except OSError as e:
-        msg = f"Failed to read SVG file {svg_file}: {e}"
-        raise ColorError(msg) from e
-
     # Replace both hex and RGB formats (case-insensitive)
     old_hex = old_color.lower()
     new_hex = new_color.lower()
@@ -359,22 +498,83 @@ def change_svg_color(
     old_rgb = f"rgb({old_rgb_vals[0]},{old_rgb_vals[1]},{old_rgb_vals[2]})"
     new_rgb = f"rgb({new_rgb_vals[0]},{new_rgb_vals[1]},{new_rgb_vals[2]})"
 
-    # Perform replacements
-    content = content.replace(old_hex, new_hex)
-    content = content.replace(old_hex.upper(), new_hex.upper())
-    content = content.replace(old_rgb, new_rgb)
+    # All replacements are done in a single pass. Lowercase is inserted last
+    # so that it wins for colors without letters, where both cases are equal
+    replacements = {
+        old_hex.upper(): new_hex.upper(),
+        old_hex: new_hex,
+        old_rgb: new_rgb,
+    }
+    pattern = re.compile("|".join(map(re.escape, replacements)))
 
     try:
-        with open(output_file, "w") as f:
-            f.write(content)
+        src = open(svg_file)
     except OSError as e:
-        msg = f"Failed to write SVG file {output_file}: {e}"
+        msg = f"Failed to read SVG file {svg_file}: {e}"
         raise ColorError(msg) from e
 
+    # Stream the file through in blocks instead of holding it all in memory
+    with src:
+        chunks = iter(functools.partial(src.read, COLOR_REPLACE_CHUNK_SIZE), "")
+        if Path(svg_file).resolve() == Path(output_file).resolve():
+            # Opening the output truncates the input, so read it whole first
+            chunks = iter([src.read()])
+        try:
+            with open(output_file, "w") as f:
+                f.writelines(_substitute_chunks(chunks, pattern, replacements))
+        except OSError as e:
+            msg = f"Failed to write SVG file {output_file}: {e}"
+            raise ColorError(msg) from e
+
+
+def _substitute_chunks(
+    chunks: Iterable[str], pattern: re.Pattern[str], replacements: dict[str, str]
+) -> Iterator[str]:
+    """Replace pattern matches in text split into chunks.
+
+    Text which could be the beginning of a match continuing in the next chunk
+    is carried over, so the result is the same as for the joined text.
 
+    Args:
+        chunks: Consecutive parts of the text
+        pattern: Pattern matching exactly the keys of replacements
+        replacements: Dictionary mapping matched strings to their replacements
+
+    Yields:
+        Consecutive parts of the text with replacements applied
+    """
+    max_match_len = max(map(len, replacements))
+    pending = ""
+    for chunk in chunks:
+        pending += chunk
+        # Matches starting before this position are complete in pending
+        safe_end = len(pending) - max_match_len + 1
+        if safe_end <= 0:
+            continue
+
+        parts = []
+        pos = 0
+        for match in pattern.finditer(pending):
+            if match.start() >= safe_end:
+                break
+            parts.append(pending[pos : match.start()])
+            parts.append(replacements[match.group()])
+            pos = match.end()
+        emit_end = max(pos, safe_end)
+        parts.append(pending[pos:emit_end])
+        yield "".join(parts)
+        pending = pending[emit_end:]
+
+    yield pattern.sub(lambda match: replacements[match.group()], pending)
+
+
+@functools.lru_cache(maxsize=1024)
 def net_name_to_css_class(net_name: str) -> str:
     """Convert net name to valid CSS class name.
 
+    Conversion is pure, results are cached since the same net names are
+    converted repeatedly while processing layers.
+
     Args:
         net_name: Net name from PCB
 
@@ -388,37 +588,14 @@ def net_name_to_css_class(net_name: str) -> str:
     # Must start with a letter or underscore
 
     # Replace common problematic characters
-    css_name = css_name.replace("/", "-")
-    css_name = css_name.replace("\\", "-")
-    css_name = css_name.replace("(", "-")
-    css_name = css_name.replace(")", "-")
-    css_name = css_name.replace(" ", "-")
-    css_name = css_name.replace(".", "-")
-    css_name = css_name.replace("_", "-")
-    css_name = css_name.replace("{", "-")
-    css_name = css_name.replace("}", "-")
-    css_name = css_name.replace(":", "-")
-    css_name = css_name.replace("<", "")
-    css_name = css_name.replace(">", "")
-    css_name = css_name.replace("$", "")  # $ is not valid in CSS identifiers
-    css_name = css_name.replace("+", "plus")  # + is not valid, replace with word
-    css_name = css_name.replace("=", "eq")  # = is not valid, replace with word
-    css_name = css_name.replace("@", "at")  # @ is not valid, replace with word
-    css_name = css_name.replace("#", "hash")  # # is not valid, replace with word
-    css_name = css_name.replace("%", "pct")  # % is not valid, replace with word
-    css_name = css_name.replace("&", "and")  # & is not valid, replace with word
-    css_name = css_name.replace("*", "star")  # * is not valid, replace with word
-    css_name = css_name.replace("!", "not")  # ! is not valid, replace with word
-    css_name = css_name.replace("?", "q")  # ? is not valid, replace with word
-    css_name = css_name.replace("~", "tilde")  # ~ is not valid, replace with word
-    css_name = css_name.replace("^", "hat")  # ^ is not valid, replace with word
+    css_name = css_name.translate(CSS_CLASS_TRANSLATION)
 
     # Remove any remaining non-CSS-compliant characters using regex
     # Keep only alphanumeric, hyphens, and underscores
-    css_name = re.sub(r"[^a-z0-9_-]", "", css_name)
+    css_name = CSS_INVALID_CHARS_RE.sub("", css_name)
 
     # Remove multiple consecutive dashes or underscores
-    css_name = re.sub(r"[-_]{2,}", "-", css_name)
+    css_name = CSS_REPEATED_SEPARATORS_RE.sub("-", css_name)
 
     # Remove leading/trailing dashes or underscores
     css_name = css_name.strip("-_")
@@ -465,6 +642,8 @@ def apply_css_class_to_svg(
     fallback_color: str,
     output_file: Path,
     layer_name: Optional[str] = None,
+    *,
+    current_color: Optional[str] = None,
 ) -> None:
     """Apply CSS class to net SVG by removing color styles and adding class attributes.
 
@@ -474,6 +653,8 @@ def apply_css_class_to_svg(
         fallback_color: Color for the CSS class definition
         output_file: Output SVG file
         layer_name: Optional layer name for per-layer CSS classes
+        current_color: Copper color already detected in svg_file, if not given
+                       it is detected from the file
 
     Raises:
         ColorError: If color operations fail
@@ -498,14 +679,16 @@ def apply_css_class_to_svg(
             f"CSS: Processing {svg_file.name} - net '{net_name}' -> class '{css_class}'"
         )
 
-    # Try to detect current copper color
-    current_color = find_copper_color_in_svg(svg_file)
+    # Try to detect current copper color, unless the caller already did
+    if current_color is None:
+        current_color = find_copper_color_in_svg(svg_file)
     if not current_color:
         logger.warning(
             f"Could not detect copper color in {svg_file}, skipping CSS processing"
         )
         # If we can't detect the color, just copy the file without modification
-        shutil.copy2(svg_file, output_file)
+        if Path(svg_file).resolve() != Path(output_file).resolve():
+            shutil.copy2(svg_file, output_file)
         return
 
     logger.debug(
@@ -515,8 +698,7 @@ def apply_css_class_to_svg(
 
     # Read SVG content
     try:
-        with open(svg_file) as f:
-            content = f.read()
+        content = Path(svg_file).read_text()
     except OSError as e:
         msg = f"Failed to read SVG file {svg_file}: {e}"
         raise ColorError(msg) from e
@@ -528,53 +710,29 @@ def apply_css_class_to_svg(
     old_rgb_vals = tuple(int(current_color[i : i + 2], 16) for i in (1, 3, 5))
     old_rgb = f"rgb({old_rgb_vals[0]},{old_rgb_vals[1]},{old_rgb_vals[2]})"
 
-    # Remove fill colors from style attributes and add class
-    def replace_fill_with_class(match):
-        style_content = match.group(1)
-        # Remove fill declarations
-        style_content = re.sub(r"fill:\s*[^;]+;?", "", style_content)
-        # Clean up extra spaces and semicolons
-        style_content = re.sub(r";\s*;", ";", style_content)
-        style_content = style_content.strip(";").strip()
-        return f'style="{style_content}" class="{css_class}"'
-
-    # Find and replace style attributes that contain our color
-    content = re.sub(
-        r'style="([^"]*(?:fill:\s*(?:'
-        + re.escape(old_hex)
-        + "|"
-        + re.escape(old_hex_upper)
-        + "|"
-        + re.escape(old_rgb)
-        + '))[^"]*)"',
-        replace_fill_with_class,
-        content,
-        flags=re.IGNORECASE,
-    )
+    # Any spelling of the detected color, for use in patterns below
+    old_color_re = "|".join(map(re.escape, (old_hex, old_hex_upper, old_rgb)))
+    fill_color_re = re.compile(rf"fill:\s*(?:{old_color_re})", re.IGNORECASE)
+    stroke_color_re = re.compile(rf"stroke:\s*(?:{old_color_re})", re.IGNORECASE)
 
-    # Remove stroke colors from style attributes
-    def replace_stroke_with_class(match):
+    # Remove fill and stroke colors from style attributes and add class
+    def replace_colors_with_class(match):
         style_content = match.group(1)
-        # Remove stroke declarations
-        style_content = re.sub(r"stroke:\s*[^;]+;?", "", style_content)
+        # Remove fill and/or stroke declarations, whichever uses our color
+        if fill_color_re.search(style_content):
+            style_content = STYLE_FILL_RE.sub("", style_content)
+        if stroke_color_re.search(style_content):
+            style_content = STYLE_STROKE_RE.sub("", style_content)
         # Clean up extra spaces and semicolons
-        style_content = re.sub(r";\s*;", ";", style_content)
+        style_content = STYLE_EMPTY_DECLARATION_RE.sub(";", style_content)
         style_content = style_content.strip(";").strip()
-        # If element already has class, don't add it again
-        if "class=" in match.group(0):
-            return f'style="{style_content}"'
         return f'style="{style_content}" class="{css_class}"'
 
-    # Find and replace style attributes that contain our stroke color
+    # Find and replace style attributes that contain our fill or stroke color,
+    # in a single pass so that each attribute gets the class added only once
     content = re.sub(
-        r'style="([^"]*(?:stroke:\s*(?:'
-        + re.escape(old_hex)
-        + "|"
-        + re.escape(old_hex_upper)
-        + "|"
-        + re.escape(old_rgb)
-        + '))[^"]*)"',
-        replace_stroke_with_class,
+        rf'style="([^"]*(?:(?:fill|stroke):\s*(?:{old_color_re}))[^"]*)"',
+        replace_colors_with_class,
         content,
         flags=re.IGNORECASE,
     )
@@ -594,8 +752,7 @@ def apply_css_class_to_svg(
         content = content[:insert_pos] + "\n" + style_section + content[insert_pos:]
 
     try:
-        with open(output_file, "w") as f:
-            f.write(content)
+        Path(output_file).write_text(content)
         logger.debug(
             f"CSS: Successfully applied class '{css_class}' to {output_file.name}"
         )
@@ -604,13 +761,21 @@ def apply_css_class_to_svg(
         raise ColorError(msg) from e
 
 
-def apply_color_to_svg(svg_file: Path, net_color: str, output_file: Path) -> None:
+def apply_color_to_svg(
+    svg_file: Path,
+    net_color: str,
+    output_file: Path,
+    *,
+    current_color: Optional[str] = None,
+) -> None:
     """Apply color to net SVG by detecting and replacing copper color.
 
     Args:
         svg_file: Input SVG file
         net_color: Color to apply (any supported format)
         output_file: Output SVG file
+        current_color: Copper color already detected in svg_file, if not given
+                       it is detected from the file
 
     Raises:
         ColorError: If color operations fail
@@ -622,14 +787,16 @@ def apply_color_to_svg(svg_file: Path, net_color: str, output_file: Path) -> Non
         msg = f"Invalid net color: {e}"
         raise ColorError(msg) from e
 
-    # Try to detect current copper color
-    current_color = find_copper_color_in_svg(svg_file)
+    # Try to detect current copper color, unless the caller already did
+    if current_color is None:
+        current_color = find_copper_color_in_svg(svg_file)
     if not current_color:
         logger.warning(
             f"Could not detect copper color in {svg_file}, skipping color processing"
         )
         # If we can't detect the color, just copy the file without modification
-        shutil.copy2(svg_file, output_file)
+        if Path(svg_file).resolve() != Path(output_file).resolve():
+            shutil.copy2(svg_file, output_file)
         return
 
     # Apply the color change
@@ -5,6 +5,8 @@
 
 from __future__ import annotations
 
+import functools
+import re
 from dataclasses import dataclass
 from enum import Enum
 
@@ -25,9 +27,12 @@ class LayerType(Enum):
     UNKNOWN = "unknown"
 
 
-@dataclass
+@dataclass(frozen=True)
 class LayerInfo:
-    """Information about a KiCad layer."""
+    """Information about a KiCad layer.
+
+    Instances are immutable, so the same instance can be shared between callers.
+    """
 
     name: str
     layer_type: LayerType
@@ -81,19 +86,35 @@ for i in range(1, 10):
     layer_name = f"User.{i}"
     LAYER_DEFINITIONS[layer_name] = LayerInfo(layer_name, LayerType.USER, False, "")
 
+# Comma separating layer names in a layer specification, with whitespace around
+LAYER_SEPARATOR_RE = re.compile(r"\s*,\s*")
+
+# Any whitespace, which only the separator pattern needs to handle
+WHITESPACE_RE = re.compile(r"\s")
+
+# Names of all copper layers, for membership tests without LayerInfo lookups
+COPPER_LAYERS = frozenset(
+    name for name, layer_info in LAYER_DEFINITIONS.items() if layer_info.is_copper
+)
 
+
+@functools.lru_cache(maxsize=256)
 def get_layer_info(layer_name: str) -> LayerInfo:
     """Get layer information for a given layer name.
 
+    Results are cached, unknown layer names get the same LayerInfo instance
+    on every call instead of a new one.
+
     Args:
         layer_name: KiCad layer name (e.g., "F.Cu", "In1.Cu")
 
     Returns:
         LayerInfo object with layer details
     """
-    return LAYER_DEFINITIONS.get(
-        layer_name, LayerInfo(layer_name, LayerType.UNKNOWN, False)
-    )
+    layer_info = LAYER_DEFINITIONS.get(layer_name)
+    if layer_info is None:
+        layer_info = LayerInfo(layer_name, LayerType.UNKNOWN, False)
+    return layer_info
 
 
 def is_copper_layer(layer_name: str) -> bool:
@@ -105,7 +126,7 @@ def is_copper_layer(layer_name: str) -> bool:
     Returns:
         True if the layer is copper, False otherwise
     """
-    return get_layer_info(layer_name).is_copper
+    return layer_name in COPPER_LAYERS
 
 
 def parse_layer_list(layer_spec: str) -> list[str]:
@@ -117,10 +138,16 @@ def parse_layer_list(layer_spec: str) -> list[str]:
     Returns:
         List of layer names
     """
-    if not layer_spec.strip():
+    layer_spec = layer_spec.strip()
+    if not layer_spec:
         return []
 
-    return [layer.strip() for layer in layer_spec.split(",") if layer.strip()]
+    # Common case without any whitespace needs no splitting by regular expression
+    if WHITESPACE_RE.search(layer_spec) is None:
+        return [layer for layer in layer_spec.split(",") if layer]
+
+    # Separators swallow surrounding whitespace, so names need no stripping
+    return [layer for layer in LAYER_SEPARATOR_RE.split(layer_spec) if layer]
 
 
 def validate_layers(layer_names: list[str]) -> list[str]:
@@ -130,13 +157,9 @@ def validate_layers(layer_names: list[str]) -> list[str]:
         layer_names: List of layer names to validate
 
     Returns:
-        List of invalid layer names (empty if all valid)
+        List of invalid layer names in input order (empty if all valid)
     """
-    invalid_layers = []
-    for layer_name in layer_names:
-        if get_layer_info(layer_name).layer_type == LayerType.UNKNOWN:
-            invalid_layers.append(layer_name)
-    return invalid_layers
+    return [layer for layer in layer_names if layer not in LAYER_DEFINITIONS]
 
 
 def get_copper_layers(layer_names: list[str]) -> list[str]:
@@ -148,7 +171,7 @@ def get_copper_layers(layer_names: list[str]) -> list[str]:
     Returns:
         List containing only copper layer names
     """
-    return [layer for layer in layer_names if is_copper_layer(layer)]
+    return [layer for layer in layer_names if layer in COPPER_LAYERS]
 
 
 def get_non_copper_layers(layer_names: list[str]) -> list[str]:
@@ -160,4 +183,24 @@ def get_non_copper_layers(layer_names: list[str]) -> list[str]:
     Returns:
         List containing only non-copper layer names
     """
-    return [layer for layer in layer_names if not is_copper_layer(layer)]
+    return [layer for layer in layer_names if layer not in COPPER_LAYERS]
+
+
+def partition_copper_layers(layer_names: list[str]) -> tuple[list[str], list[str]]:
+    """Split a layer list into copper and non-copper layers in a single pass.
+
+    Args:
+        layer_names: List of layer names
+
+    Returns:
+        Tuple of copper layer names and non-copper layer names, both in
+        the original order
+    """
+    copper_layers: list[str] = []
+    non_copper_layers: list[str] = []
+    for layer in layer_names:
+        if layer in COPPER_LAYERS:
+            copper_layers.append(layer)
+        else:
+            non_copper_layers.append(layer)
+    return copper_layers, non_copper_layers
@@ -391,7 +391,12 @@ def _generate_individual_net_svgs_single_layer(
                 detected_color = find_copper_color_in_svg(raw_svg)
                 if detected_color:
                     apply_css_class_to_svg(
-                        raw_svg, net_name, detected_color, final_svg, layer_name
+                        raw_svg,
+                        net_name,
+                        detected_color,
+                        final_svg,
+                        layer_name,
+                        current_color=detected_color,
                     )
                 else:
                     # No color detected, just copy the file without CSS processing
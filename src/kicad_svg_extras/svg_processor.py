@@ -283,12 +283,17 @@ def remove_empty_groups(svg_file: Path) -> None:
     tree = ET.parse(svg_file)
     root = tree.getroot()
 
-    def _remove_empty_groups(root) -> None:
-        for elem in root.findall(f".//{{{SVG_NS}}}g"):
-            if len(elem) == 0:
-                root.remove(elem)
-        for child in root:
+    group_tag = f"{{{SVG_NS}}}g"
+
+    def _remove_empty_groups(node) -> None:
+        # Walk children backwards so that deleting by index does not shift
+        # the ones still to visit, and clean up each child's subtree first so
+        # that groups left empty by this get removed as well
+        for i in range(len(node) - 1, -1, -1):
+            child = node[i]
             _remove_empty_groups(child)
+            if child.tag == group_tag and len(child) == 0:
+                del node[i]
 
     _remove_empty_groups(root)
     tree.write(svg_file, encoding="unicode")
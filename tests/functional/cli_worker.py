@@ -0,0 +1,100 @@
+# SPDX-FileCopyrightText: 2025-present adamws <adamws@users.noreply.github.com>
+#
+# SPDX-License-Identifier: MIT
+"""Persistent worker running kicad-svg-extras CLI invocations in-process.
+
+Reads one JSON request per line from stdin (``{"argv": [...], "cwd": ...}``),
+runs the CLI entry point with given arguments and writes one JSON response
+per line (``{"returncode": ..., "stdout": ..., "stderr": ...}``) back.
+The interpreter starts and imports the package once for all requests.
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import traceback
+from typing import Any, Optional
+
+from kicad_svg_extras.__main__ import main as cli_main
+
+# Standard file descriptors, redirected to temporary files for each request
+STDOUT_FD = 1
+STDERR_FD = 2
+
+
+def run_cli(argv: list[str], cwd: Optional[str]) -> dict[str, Any]:
+    """Run CLI with given arguments, capturing its output and exit code.
+
+    Output is captured on file descriptor level, so text written directly by
+    native code (e.g. KiCad libraries) is included, as for a separate process.
+    """
+    root_logger = logging.getLogger()
+    saved_handlers = root_logger.handlers[:]
+    saved_level = root_logger.level
+    saved_argv = sys.argv
+    saved_cwd = os.getcwd()
+
+    returncode = 0
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        saved_fds = os.dup(STDOUT_FD), os.dup(STDERR_FD)
+        os.dup2(stdout.fileno(), STDOUT_FD)
+        os.dup2(stderr.fileno(), STDERR_FD)
+        try:
+            if cwd:
+                os.chdir(cwd)
+            sys.argv = ["kicad-svg-extras", *argv]
+            try:
+                cli_main()
+            except SystemExit as e:
+                # Same exit code mapping as the interpreter uses
+                if e.code is None:
+                    returncode = 0
+                elif isinstance(e.code, int):
+                    returncode = e.code
+                else:
+                    sys.stderr.write(f"{e.code}\n")
+                    returncode = 1
+            except Exception:
+                traceback.print_exc()
+                returncode = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            for fd, saved_fd in zip((STDOUT_FD, STDERR_FD), saved_fds):
+                os.dup2(saved_fd, fd)
+                os.close(saved_fd)
+            sys.argv = saved_argv
+            os.chdir(saved_cwd)
+            # Logging handlers set up by the CLI write to this run's output
+            root_logger.handlers[:] = saved_handlers
+            root_logger.setLevel(saved_level)
+
+        stdout.seek(0)
+        stderr.seek(0)
+        return {
+            "returncode": returncode,
+            "stdout": stdout.read().decode(sys.stdout.encoding, errors="replace"),
+            "stderr": stderr.read().decode(sys.stderr.encoding, errors="replace"),
+        }
+
+
+def serve() -> None:
+    """Serve requests from stdin until it is closed."""
+    # Keep the original stdout for responses only. Between requests, anything
+    # written directly to file descriptor 1 goes to stderr
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), "w")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+
+    for line in sys.stdin:
+        request = json.loads(line)
+        response = run_cli(request["argv"], request.get("cwd"))
+        responses.write(json.dumps(response) + "\n")
+        responses.flush()
+
+
+if __name__ == "__main__":
+    serve()
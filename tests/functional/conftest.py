@@ -3,15 +3,28 @@
 # SPDX-License-Identifier: MIT
 """Pytest configuration and fixtures for functional tests."""
 
+import base64
+import contextlib
+import hashlib
+import html
+import json
+import os
+import queue
 import shutil
 import subprocess
+import sys
 import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from types import ModuleType
 from typing import Optional
 
 import pytest
+from lxml import etree
 
-# We'll use the plugin manager to check for pytest-html availability
+import kicad_svg_extras
+from kicad_svg_extras.pcbnew_discovery import import_pcbnew
 
 # Test data paths
 FUNCTIONAL_DIR = Path(__file__).parent
@@ -20,20 +33,113 @@ PCB_FILES_DIR = DATA_DIR / "pcb_files"
 CONFIG_FILES_DIR = DATA_DIR / "config_files"
 REFERENCES_DIR = FUNCTIONAL_DIR / "references"
 
+# Results kept between test runs (kicad-cli references, generated SVGs). Kept
+# apart from the pytest cache, so functional runs can disable that plugin
+CACHE_DIR = FUNCTIONAL_DIR / ".cache"
 
-@pytest.fixture
-def temp_output_dir(tmpdir):
-    """Create temporary directory for test outputs."""
-    with tempfile.TemporaryDirectory(dir=tmpdir, delete=False) as tmp_dir:
-        yield Path(tmp_dir)
+# Environment variable which, when set (e.g. in CI), disables reuse of cached
+# results, so that every result is produced by the code under test
+NO_CACHE_ENV = "KICAD_SVG_EXTRAS_TEST_NO_CACHE"
+
+# Script serving CLI invocations from a single long-lived interpreter
+CLI_WORKER = FUNCTIONAL_DIR / "cli_worker.py"
+
+# Maximum time in seconds a single CLI invocation may take
+CLI_TIMEOUT = 60
+
+# Sources of the tool under test, part of the generated SVG cache key
+PACKAGE_DIR = Path(kicad_svg_extras.__file__).parent
+
+# Maximum number of threads used to read SVG files for the HTML report
+MAX_REPORT_WORKERS = 8
+
+# Maximum number of characters of CLI stdout/stderr kept for the HTML report
+MAX_REPORT_OUTPUT_CHARS = 64 * 1024
+
+# pytest-html plugin module when an HTML report is being generated in this
+# session (None otherwise), resolved once in pytest_configure so that hooks do
+# not look it up per test and report-building code can be skipped entirely
+HTML_PLUGIN = pytest.StashKey[Optional[ModuleType]]()
 
 
 @pytest.fixture
+def temp_output_dir(tmp_path: Path) -> Path:
+    """Temporary directory for test outputs.
+
+    Uses pytest's own per-test directory, which is kept for inspection and
+    cleaned up lazily by pytest (only the last few sessions are retained).
+    """
+    return tmp_path
+
+
+@pytest.fixture(scope="session")
 def pcb_files_dir() -> Path:
     """Path to PCB test files directory."""
     return PCB_FILES_DIR
 
 
+@pytest.fixture(scope="session")
+def pcb_files(pcb_files_dir) -> tuple[Path, ...]:
+    """All PCB test files, globbed once per session."""
+    return tuple(pcb_files_dir.glob("**/*.kicad_pcb"))
+
+
+@pytest.fixture(scope="session")
+def cache_dir(tmp_path_factory) -> Path:
+    """Directory for results kept between test runs.
+
+    When NO_CACHE_ENV is set, an empty directory of this session is used.
+    """
+    if os.environ.get(NO_CACHE_ENV):
+        return Path(tmp_path_factory.mktemp("cache"))
+    CACHE_DIR.mkdir(exist_ok=True)
+    return CACHE_DIR
+
+
+@pytest.fixture(scope="session")
+def svg_cache_path(cache_dir: Path):
+    """Factory for locating generated SVGs cached between test runs.
+
+    The cache key covers everything the generated SVG depends on: all package
+    files, the Python, pcbnew, kicad-cli and lxml versions, the PCB file
+    content and the CLI arguments (without the output path, in given order
+    since layer order matters). Any change to these produces a new key, so
+    stale results are never reused. The factory returns None when kicad-cli
+    or pcbnew is not available.
+    """
+    try:
+        kicad_version = subprocess.run(
+            ["kicad-cli", "version"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        pcbnew_version = import_pcbnew().Version()
+    except (subprocess.CalledProcessError, FileNotFoundError, ImportError):
+        kicad_version = None
+
+    base_key = hashlib.sha256()
+    if kicad_version is not None:
+        for package_file in sorted(PACKAGE_DIR.rglob("*")):
+            if package_file.is_file() and "__pycache__" not in package_file.parts:
+                base_key.update(
+                    package_file.relative_to(PACKAGE_DIR).as_posix().encode()
+                )
+                base_key.update(package_file.read_bytes())
+        for version in (sys.version, pcbnew_version, kicad_version, etree.__version__):
+            base_key.update(f"{version}\0".encode())
+    svg_dir = cache_dir / "generated_svg"
+    svg_dir.mkdir(exist_ok=True)
+
+    def get_path(pcb_file: Path, args: list[str]) -> Optional[Path]:
+        """Get cache path for SVG generated from pcb_file with given arguments."""
+        if kicad_version is None:
+            return None
+        key = base_key.copy()
+        key.update(pcb_file.read_bytes())
+        key.update("\0".join(args).encode())
+        return svg_dir / f"{key.hexdigest()}.svg"
+
+    return get_path
+
+
 @pytest.fixture
 def reference_dir() -> Path:
     """Get reference directory."""
@@ -42,8 +148,113 @@ def reference_dir() -> Path:
     return REFERENCES_DIR
 
 
+class _CliWorker:
+    """Long-lived process running kicad-svg-extras CLI invocations.
+
+    Starting the interpreter and importing the package (including pcbnew) is
+    paid once instead of once per CLI call. A worker which timed out or died is
+    replaced on the next call. If it cannot start at all, calls are refused
+    and the caller falls back to running the CLI in a new process.
+    """
+
+    def __init__(self) -> None:
+        self.available = True
+        self._process: Optional[subprocess.Popen] = None
+        self._responses: queue.Queue[Optional[str]] = queue.Queue()
+        self._answered = 0
+
+    def _start(self) -> subprocess.Popen:
+        process = subprocess.Popen(  # noqa: S603
+            [sys.executable, "-u", str(CLI_WORKER)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+        )
+        # Reading in a thread allows waiting for a response with a timeout on
+        # all platforms (select does not support pipes on Windows). Each
+        # process gets its own queue, so a replaced worker leaves no stale data
+        self._responses = queue.Queue()
+        threading.Thread(
+            target=self._read_responses,
+            args=(process.stdout, self._responses),
+            daemon=True,
+        ).start()
+        self._process = process
+        self._answered = 0
+        return process
+
+    @staticmethod
+    def _read_responses(stdout, responses: queue.Queue) -> None:
+        for line in stdout:
+            responses.put(line)
+        responses.put(None)
+
+    def run(self, argv: list[str], cwd: Optional[Path]) -> Optional[dict]:
+        """Run CLI with given arguments in the worker.
+
+        Returns None when the worker is not available or exited without
+        responding, so the call can be repeated in a separate process.
+        """
+        if not self.available:
+            return None
+        process = self._process
+        if process is None or process.poll() is not None:
+            try:
+                process = self._start()
+            except OSError:
+                self.available = False
+                return None
+
+        request_line = json.dumps({"argv": argv, "cwd": cwd and str(cwd)})
+        assert process.stdin is not None
+        with contextlib.suppress(BrokenPipeError):
+            # Worker which died is reported by the reader, with end of output
+            process.stdin.write(request_line + "\n")
+            process.stdin.flush()
+        try:
+            response_line = self._responses.get(timeout=CLI_TIMEOUT)
+        except queue.Empty:
+            process.kill()
+            self.close()
+            raise subprocess.TimeoutExpired(argv, CLI_TIMEOUT) from None
+
+        if response_line is None:
+            # Worker which never responded is broken, e.g. fails on import
+            self.available = self._answered > 0
+            self.close()
+            return None
+        self._answered += 1
+        response: dict = json.loads(response_line)
+        return response
+
+    def close(self) -> None:
+        """Stop the worker, killing it if it does not exit in time."""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        if process.stdin is not None:
+            with contextlib.suppress(BrokenPipeError):
+                process.stdin.close()
+        try:
+            process.wait(timeout=CLI_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+@pytest.fixture(scope="session")
+def cli_worker():
+    """Long-lived worker running kicad-svg-extras CLI invocations.
+
+    The installed entry point itself is still exercised by the basic CLI tests.
+    """
+    worker = _CliWorker()
+    yield worker
+    worker.close()
+
+
 @pytest.fixture
-def cli_runner(request):
+def cli_runner(request, cli_worker):
     """Helper for running kicad-svg-extras CLI commands with auto output capture."""
 
     def run_cli(
@@ -51,19 +262,37 @@ def cli_runner(request):
     ) -> subprocess.CompletedProcess:
         """Run kicad-svg-extras CLI with given arguments."""
         cmd = ["kicad-svg-extras", "--keep-intermediates", *args]
-        result = subprocess.run(  # noqa: S603
-            cmd, capture_output=True, text=True, check=check, cwd=cwd, timeout=60
-        )
+        response = cli_worker.run(cmd[1:], cwd)
+        if response is not None:
+            result = subprocess.CompletedProcess(
+                cmd, response["returncode"], response["stdout"], response["stderr"]
+            )
+        else:
+            result = subprocess.run(  # noqa: S603
+                cmd,
+                capture_output=True,
+                text=True,
+                check=False,
+                cwd=cwd,
+                timeout=CLI_TIMEOUT,
+            )
+        if check:
+            result.check_returncode()
 
         # Automatically capture CLI output if capture_outputs fixture is available
-        if hasattr(request.node, "_pytest_html_cli_outputs"):
+        # and the output is going to end up in an HTML report
+        if request.config.stash.get(HTML_PLUGIN, None) and hasattr(
+            request.node, "_pytest_html_cli_outputs"
+        ):
             cmd_str = " ".join(cmd)
             cli_outputs = getattr(request.node, "_pytest_html_cli_outputs", [])
             cli_outputs.append(
                 {
                     "command": cmd_str,
-                    "stdout": result.stdout,
-                    "stderr": result.stderr,
+                    # Only the report copy is truncated, the returned result
+                    # keeps the full output for assertions
+                    "stdout": _truncate_output(result.stdout),
+                    "stderr": _truncate_output(result.stderr),
                     "returncode": result.returncode,
                 }
             )
@@ -74,6 +303,43 @@ def cli_runner(request):
     return run_cli
 
 
+@pytest.fixture
+def cli_svg(cli_runner, svg_cache_path):
+    """Helper for generating an SVG with the CLI, reusing cached results.
+
+    When an SVG for the same PCB file and arguments (the output path is not
+    part of the key) is in the cache, it is copied to the requested output
+    instead of invoking the CLI again. Otherwise, the CLI is run and its
+    result is stored in the cache.
+    """
+
+    def run(pcb_file: Path, args: list[str], output_file: Path) -> None:
+        """Generate output_file from pcb_file with given CLI arguments."""
+        cached_svg = svg_cache_path(pcb_file, [*args, str(pcb_file)])
+        if cached_svg is not None and cached_svg.is_file():
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(cached_svg, output_file)
+            return
+
+        result = cli_runner(["--output", str(output_file), *args, str(pcb_file)])
+        assert result.returncode == 0, f"CLI failed: {result.stderr}"
+        if cached_svg is not None:
+            # Other xdist workers may read the same entry, so never expose
+            # a partially copied file: copy aside, then rename into place
+            with tempfile.NamedTemporaryFile(
+                dir=cached_svg.parent, suffix=".tmp", delete=False
+            ) as tmp:
+                tmp_path = Path(tmp.name)
+            try:
+                shutil.copyfile(output_file, tmp_path)
+                os.replace(tmp_path, cached_svg)
+            except BaseException:
+                tmp_path.unlink(missing_ok=True)
+                raise
+
+    return run
+
+
 @pytest.fixture
 def sample_configs() -> dict[str, Path]:
     """Dictionary of sample configuration files."""
@@ -91,13 +357,19 @@ def pytest_configure(config):
     )
     config.addinivalue_line("markers", "slow: mark test as slow running")
 
+    # Report extras are only useful when pytest-html is installed and --html given
+    html_path = config.getoption("htmlpath", default=None)
+    html_plugin = config.pluginmanager.getplugin("html")
+    config.stash[HTML_PLUGIN] = html_plugin if html_path else None
+
 
-@pytest.hookimpl(tryfirst=True)
+@pytest.hookimpl(tryfirst=True, optionalhook=True)
 def pytest_html_report_title(report):
     """Customize HTML report title."""
     report.title = "KiCad SVG Extras - Functional Test Report"
 
 
+@pytest.hookimpl(optionalhook=True)
 def pytest_html_results_summary(prefix, summary, postfix):  # noqa: ARG001
     """Add custom CSS to the HTML report results."""
     css_path = FUNCTIONAL_DIR / "report.css"
@@ -113,22 +385,27 @@ def pytest_collection_modifyitems(config, items):  # noqa: ARG001
     """Modify test collection to handle PCB file requirements."""
     skip_pcb_tests = pytest.mark.skip(reason="PCB file not provided yet")
 
+    # Check once if any PCB files exist in test data
+    if any(PCB_FILES_DIR.glob("**/*.kicad_pcb")):
+        return
+
     for item in items:
         if "requires_pcb_file" in item.keywords:
-            # Check if any PCB files exist in test data
-            if not any(PCB_FILES_DIR.glob("**/*.kicad_pcb")):
-                item.add_marker(skip_pcb_tests)
+            item.add_marker(skip_pcb_tests)
 
 
 @pytest.hookimpl(hookwrapper=True)
 def pytest_runtest_makereport(item, call):  # noqa: ARG001
     """Hook to add generated SVG images to HTML report."""
     outcome = yield
+    pytest_html = item.config.stash.get(HTML_PLUGIN, None)
+    if not pytest_html:
+        return
+
     report = outcome.get_result()
 
     # Only add extras on test call (not setup/teardown)
-    pytest_html = item.config.pluginmanager.getplugin("html")
-    if pytest_html and report.when == "call":
+    if report.when == "call":
         extras = getattr(report, "extras", [])
 
         # Look for test output directories in the test function
@@ -167,6 +444,42 @@ def _scale_svg_for_html_display(svg_content: str) -> str:
     return svg_content.replace('mm"', 'cm"')
 
 
+def _render_svg_report_item(svg_file: Path, source_dir: Path) -> str:
+    """Render a single SVG file as an HTML report item."""
+    try:
+        # Read SVG content
+        svg_content = svg_file.read_text(encoding="utf-8")
+
+        # Apply scaling for HTML display only
+        display_svg_content = _scale_svg_for_html_display(svg_content)
+
+        # Embed as image data URI so the browser renders it lazily in its
+        # image pipeline instead of laying out the SVG markup in the document
+        svg_b64 = base64.b64encode(display_svg_content.encode("utf-8")).decode("ascii")
+
+        # Create individual SVG item with source directory info
+        return (
+            f'<div class="svg-item-container">'
+            f'<div class="svg-item-title">📄 {svg_file.name}</div>'
+            f'<div class="svg-item-content"><img loading="lazy" alt="{svg_file.name}" '
+            f'src="data:image/svg+xml;base64,{svg_b64}"></div>'
+            f'<div class="svg-item-info">'
+            f"Size: {svg_file.stat().st_size:,} bytes<br>"
+            f"From: {source_dir.name}</div>"
+            f"</div>"
+        )
+
+    except Exception as e:
+        # If we can't read the SVG, add an error item
+        return (
+            f'<div class="error-item-container">'
+            f'<div class="error-item-title">'
+            f"❌ Could not display {svg_file.name}</div>"
+            f'<div class="svg-item-info">Error: {e}</div>'
+            f"</div>"
+        )
+
+
 def _add_all_svg_files_to_report(
     extras: list, output_dirs: list, test_name: str, pytest_html
 ) -> None:
@@ -191,47 +504,29 @@ def _add_all_svg_files_to_report(
     )
     extras.append(pytest_html.extras.html(header_html))
 
-    # Create a flex container for side-by-side SVG display
-    svg_items_html = []
-
-    # Process each SVG file
-    for svg_file, source_dir in sorted(all_svg_files, key=lambda x: x[0].name):
-        try:
-            # Read SVG content
-            svg_content = svg_file.read_text(encoding="utf-8")
-
-            # Apply scaling for HTML display only
-            display_svg_content = _scale_svg_for_html_display(svg_content)
-
-            # Create individual SVG item with source directory info
-            svg_item = (
-                f'<div class="svg-item-container">'
-                f'<div class="svg-item-title">📄 {svg_file.name}</div>'
-                f'<div class="svg-item-content">{display_svg_content}</div>'
-                f'<div class="svg-item-info">'
-                f"Size: {svg_file.stat().st_size:,} bytes<br>"
-                f"From: {source_dir.name}</div>"
-                f"</div>"
-            )
-            svg_items_html.append(svg_item)
-
-        except Exception as e:
-            # If we can't read the SVG, add an error item
-            error_item = (
-                f'<div class="error-item-container">'
-                f'<div class="error-item-title">'
-                f"❌ Could not display {svg_file.name}</div>"
-                f'<div class="svg-item-info">Error: {e}</div>'
-                f"</div>"
-            )
-            svg_items_html.append(error_item)
+    # Create a flex container for side-by-side SVG display, built into a single
+    # buffer so the (potentially large) SVG markup is joined only once
+    svg_items_html = ['<div class="svg-flex-container">']
+
+    # Read and render SVG files concurrently, reading is I/O bound and
+    # executor.map keeps the results in submission (file name) order
+    sorted_svg_files = sorted(all_svg_files, key=lambda x: x[0].name)
+    max_workers = min(MAX_REPORT_WORKERS, len(sorted_svg_files))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        svg_items_html.extend(
+            executor.map(lambda args: _render_svg_report_item(*args), sorted_svg_files)
+        )
 
     # Add the flex container with all SVG items
-    if svg_items_html:
-        flex_container = (
-            f'<div class="svg-flex-container">{" ".join(svg_items_html)}</div>'
-        )
-        extras.append(pytest_html.extras.html(flex_container))
+    svg_items_html.append("</div>")
+    extras.append(pytest_html.extras.html("".join(svg_items_html)))
+
+
+def _truncate_output(output: str) -> str:
+    """Truncate CLI output to at most MAX_REPORT_OUTPUT_CHARS characters."""
+    if len(output) <= MAX_REPORT_OUTPUT_CHARS:
+        return output
+    return output[:MAX_REPORT_OUTPUT_CHARS] + "\n... <truncated>"
 
 
 def _add_cli_outputs_to_report(
@@ -249,9 +544,10 @@ def _add_cli_outputs_to_report(
     extras.append(pytest_html.extras.html(header_html))
 
     for i, output_info in enumerate(cli_outputs, 1):
-        command = output_info.get("command", "Unknown command")
-        stdout = output_info.get("stdout", "")
-        stderr = output_info.get("stderr", "")
+        # Escape everything coming from the CLI, it is arbitrary text
+        command = html.escape(output_info.get("command", "Unknown command"))
+        stdout = html.escape(output_info.get("stdout", ""))
+        stderr = html.escape(output_info.get("stderr", ""))
         returncode = output_info.get("returncode", "Unknown")
 
         # Determine status class
@@ -320,7 +616,10 @@ def capture_outputs(request, reference_dir, generate_references):
                     ref_filename = f"{test_name}_{svg_file.name}"
                     ref_path = pcb_ref_dir / ref_filename
 
-                    shutil.copy2(svg_file, ref_path)
+                    # Reference files need only the content, copyfile skips
+                    # the metadata copy of copy2 and uses the platform fast-copy
+                    # (sendfile on Linux)
+                    shutil.copyfile(svg_file, ref_path)
                     copied_files.append(ref_path)
 
         if copied_files:
@@ -13,13 +13,13 @@ def test_cli_help():
     """Test that the CLI help works."""
     result = subprocess.run(
         ["kicad-svg-extras", "--help"],
-        capture_output=True,
-        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
         check=False,
     )
 
     assert result.returncode == 0
-    assert "Generate SVG files with custom per-net colors" in result.stdout
+    assert b"Generate SVG files with custom per-net colors" in result.stdout
 
 
 @pytest.mark.functional
@@ -27,9 +27,9 @@ def test_kicad_cli_available():
     """Test that KiCad CLI is available."""
     result = subprocess.run(
         ["kicad-cli", "version"],
-        capture_output=True,
-        text=True,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
         check=False,
     )
     assert result.returncode == 0
-    assert "9." in result.stdout
+    assert b"9." in result.stdout
@@ -2,13 +2,63 @@
 #
 # SPDX-License-Identifier: MIT
 """Functional tests for SVG generation from KiCad PCB files."""
+import hashlib
+import inspect
+import os
+import re
+import shutil
 import subprocess
-import xml.etree.ElementTree as ET
+import tempfile
 from pathlib import Path
 
 import pytest
+from lxml import etree
 from xmldiff import main as xmldiff_main
 
+# Formatter holds no per-comparison state, create it once for all comparisons
+DIFF_FORMATTER = xmldiff_main.FORMATTERS["diff"]()
+
+# Drop whitespace-only text when parsing, like xmldiff's diff_files does, so
+# formatting differences between the two SVGs are not reported
+DIFF_PARSER = etree.XMLParser(remove_blank_text=True)
+
+# Diff lines related to title and desc elements: their content and moves
+METADATA_DIFF_RE = re.compile(
+    r"title\]|desc\]|update-text, /\*/\*\[[12]\]"
+    r"|^(?=.*move)(?=.*/\*/\*\[(?:1|12)\])"
+)
+
+# SVG groups without any child elements
+EMPTY_GROUPS_XPATH = etree.XPath(
+    "//svg:g[not(*)]", namespaces={"svg": "http://www.w3.org/2000/svg"}
+)
+
+
+# Drawn SVG elements, that is anything but groups and metadata
+DRAWN_ELEMENTS_XPATH = etree.XPath(
+    "//svg:g/*[not(self::svg:g)]", namespaces={"svg": "http://www.w3.org/2000/svg"}
+)
+
+
+def assert_svg_drawing(svg_file: Path) -> None:
+    """Assert that svg_file is an SVG with colored drawing content.
+
+    Generated SVGs may be restored from the cache instead of produced by the CLI
+    in the current run, so checking the file exists is not enough.
+    """
+    root = etree.parse(str(svg_file)).getroot()
+    assert root.tag == "{http://www.w3.org/2000/svg}svg", f"Not an SVG: {svg_file}"
+
+    drawn = DRAWN_ELEMENTS_XPATH(root)
+    assert drawn, f"No drawing content in {svg_file}"
+
+    colored = any(
+        "#" in elem.get("fill", "") + elem.get("stroke", "") + elem.get("style", "")
+        or "#" in (elem.getparent().get("style") or "")
+        for elem in drawn
+    )
+    assert colored, f"No colored drawing content in {svg_file}"
+
 
 @pytest.mark.functional
 @pytest.mark.requires_pcb_file
@@ -21,15 +71,14 @@ class TestSVGGeneration:
     )
     def test_basic_svg_generation(
         self,
-        cli_runner,
+        cli_svg,
         temp_output_dir,
-        pcb_files_dir,
+        pcb_files,
         capture_outputs,
         fit_to_content,
     ):
         """Test basic SVG generation without any special options."""
         # This test will be skipped until PCB files are provided
-        pcb_files = list(pcb_files_dir.glob("**/*.kicad_pcb"))
         if not pcb_files:
             pytest.skip("No PCB files available for testing")
 
@@ -39,24 +88,17 @@ class TestSVGGeneration:
         # Register output directory for HTML report capture
         capture_outputs(output_dir)
 
-        # Run CLI command
+        # Run CLI command (or reuse result of a previous run with same inputs)
         output_file = output_dir / "test_output.svg"
-        result = cli_runner(
-            [
-                "--output",
-                str(output_file),
-                "--layers",
-                "F.Cu,B.Cu",
-                "--fit-to-content",
-                fit_to_content,
-                str(pcb_file),
-            ]
+        cli_svg(
+            pcb_file,
+            ["--layers", "F.Cu,B.Cu", "--fit-to-content", fit_to_content],
+            output_file,
         )
 
-        assert result.returncode == 0, f"CLI failed: {result.stderr}"
-
         # Check that the output SVG file was generated
         assert output_file.exists(), f"Expected output SVG not found: {output_file}"
+        assert_svg_drawing(output_file)
 
         # Copy to references if flag is set
         capture_outputs.copy_to_references("basic", pcb_file.stem)
@@ -73,15 +115,14 @@ class TestSVGGeneration:
     )
     def test_layer_combinations(
         self,
-        cli_runner,
+        cli_svg,
         temp_output_dir,
-        pcb_files_dir,
+        pcb_files,
         capture_outputs,
         layers,
         test_name,
     ):
         """Test various layer combinations."""
-        pcb_files = list(pcb_files_dir.glob("**/*.kicad_pcb"))
         if not pcb_files:
             pytest.skip("No PCB files available for testing")
 
@@ -94,21 +135,13 @@ class TestSVGGeneration:
         # Register output directory for HTML report capture
         capture_outputs(output_dir)
 
+        # Reuse SVG generated by a previous run with identical inputs
         output_file = output_dir / f"{test_name}.svg"
-        result = cli_runner(
-            [
-                "--output",
-                str(output_file),
-                "--layers",
-                layers_str,
-                str(pcb_file),
-            ]
-        )
-
-        assert result.returncode == 0, f"Failed for layers {layers}: {result.stderr}"
+        cli_svg(pcb_file, ["--layers", layers_str], output_file)
 
         # Verify output file exists
         assert output_file.exists(), f"No SVG file generated for layers: {layers}"
+        assert_svg_drawing(output_file)
 
         # Copy to references if flag is set (with unique name)
         capture_outputs.copy_to_references(
@@ -119,12 +152,11 @@ class TestSVGGeneration:
         self,
         cli_runner,
         temp_output_dir,
-        pcb_files_dir,
+        pcb_files,
         sample_configs,
         capture_outputs,
     ):
         """Test net color application."""
-        pcb_files = list(pcb_files_dir.glob("**/*.kicad_pcb"))
         if not pcb_files:
             pytest.skip("No PCB files available for testing")
 
@@ -155,16 +187,19 @@ class TestSVGGeneration:
 
         # Verify colors are applied by checking file content
         svg_file = output_file
-        content = svg_file.read_text()
-        # Should contain colored elements (any hex color, not just black/white)
+        # Should contain colored elements (any hex color, not just black/white).
+        # Search the raw bytes (in both letter cases) instead of decoding and
+        # lowercasing the whole SVG. The most common pattern goes first, it
+        # appears near the top of KiCad output and ends the scan
+        content = svg_file.read_bytes()
         has_colors = any(
-            color_pattern in content.lower()
+            color_pattern in content or color_pattern.upper() in content
             for color_pattern in [
-                "#c83434",
-                "#ff0000",
-                "#0000ff",
-                "#00ff00",
-                "fill:#",
+                b"fill:#",
+                b"#c83434",
+                b"#ff0000",
+                b"#0000ff",
+                b"#00ff00",
             ]
         )
         assert has_colors, f"No colored elements found in {svg_file}"
@@ -178,22 +213,51 @@ class TestLayerOrderComparison:
     """Test layer merging order against KiCad CLI output."""
 
     def remove_empty_groups(self, svg_file: Path) -> None:
-        tree = ET.parse(svg_file)
-        root = tree.getroot()
-        name = "{http://www.w3.org/2000/svg}g"
-
-        def _remove_empty_groups(root) -> None:
-            for elem in root.findall(name):
-                if len(elem) == 0:
-                    root.remove(elem)
-            for child in root:
-                _remove_empty_groups(child)
-
-        _remove_empty_groups(root)
-        tree.write(svg_file, encoding="unicode")
+        tree = etree.parse(str(svg_file))
+
+        # Let libxml2 find all groups without child elements in one query.
+        # Removing them may leave their parents empty, so repeat until stable
+        while empty_groups := EMPTY_GROUPS_XPATH(tree):
+            for elem in empty_groups:
+                elem.getparent().remove(elem)
+        tree.write(str(svg_file), encoding="utf-8")
+
+    def reference_cache_path(
+        self, cache_dir: Path, pcb_file: Path, export_args: list[str]
+    ) -> Path:
+        """Get path of the cached kicad-cli reference SVG for given inputs.
+
+        The key covers everything the reference depends on (PCB content, export
+        arguments, kicad-cli version and the cleanup applied before caching),
+        so changed inputs never hit a stale entry.
+        """
+        version = subprocess.run(
+            ["kicad-cli", "version"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+        key = hashlib.sha256(pcb_file.read_bytes())
+        key.update("\0".join(export_args).encode())
+        key.update(version.encode())
+        key.update(inspect.getsource(self.remove_empty_groups).encode())
+        key.update(EMPTY_GROUPS_XPATH.path.encode())
+        reference_dir = cache_dir / "kicad_reference"
+        reference_dir.mkdir(exist_ok=True)
+        return reference_dir / f"{key.hexdigest()}.svg"
+
+    def store_reference(self, svg_file: Path, cached_reference: Path) -> None:
+        """Store reference in cache, atomically so readers never see partial files."""
+        with tempfile.NamedTemporaryFile(
+            dir=cached_reference.parent, suffix=".tmp", delete=False
+        ) as tmp:
+            tmp_path = Path(tmp.name)
+        try:
+            shutil.copyfile(svg_file, tmp_path)
+            os.replace(tmp_path, cached_reference)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
 
     def test_with_kicad_cli_reference(
-        self, cli_runner, temp_output_dir, pcb_files_dir, capture_outputs
+        self, cache_dir, cli_runner, temp_output_dir, pcb_files_dir, capture_outputs
     ):
         """Test that our SVG generation produces semantically equivalent output
         to KiCad CLI export using xmldiff for comparison."""
@@ -210,36 +274,53 @@ class TestLayerOrderComparison:
         layers = ["F.Cu", "B.Cu", "Edge.Cuts"]
         layers_str = ",".join(layers)
 
-        # Generate reference SVG using kicad-cli
+        # Generate reference SVG using kicad-cli, unless one generated by
+        # a previous run for identical inputs is cached
         kicad_reference = output_dir / "kicad_reference.svg"
 
+        export_args = [
+            "--exclude-drawing-sheet",
+            "--page-size-mode",
+            "0",
+            "--layers",
+            layers_str,
+        ]
+
         try:
-            # Run kicad-cli to generate reference SVG
-            kicad_cmd = [
-                "kicad-cli",
-                "pcb",
-                "export",
-                "svg",
-                "--exclude-drawing-sheet",
-                "--page-size-mode",
-                "0",
-                "--layers",
-                layers_str,
-                "--output",
-                str(kicad_reference),
-                str(pcb_file),
-            ]
-            result = subprocess.run(  # noqa: S603
-                kicad_cmd, capture_output=True, text=True, check=True
+            cached_reference = self.reference_cache_path(
+                cache_dir, pcb_file, export_args
             )
+            use_cached = cached_reference.is_file()
+            if not use_cached:
+                # Run kicad-cli to generate reference SVG
+                kicad_cmd = [
+                    "kicad-cli",
+                    "pcb",
+                    "export",
+                    "svg",
+                    *export_args,
+                    "--output",
+                    str(kicad_reference),
+                    str(pcb_file),
+                ]
+                subprocess.run(  # noqa: S603
+                    kicad_cmd, capture_output=True, text=True, check=True
+                )
         except subprocess.CalledProcessError as e:
             pytest.skip(f"kicad-cli not available or failed: {e}")
         except FileNotFoundError:
             pytest.skip("kicad-cli not found in PATH")
 
-        # kicad-cli creates a lot of empty groups. Remove them to make
-        # comparison with our results easier (we remove empty groups by default).
-        self.remove_empty_groups(kicad_reference)
+        if use_cached:
+            # Cached reference has already been cleaned up
+            output_dir.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(cached_reference, kicad_reference)
+        else:
+            # kicad-cli creates a lot of empty groups. Remove them to make
+            # comparison with our results easier (we remove empty groups by
+            # default).
+            self.remove_empty_groups(kicad_reference)
+            self.store_reference(kicad_reference, cached_reference)
 
         # Generate our tool's SVG output (without custom colors to match kicad-cli)
         our_svg_file = output_dir / "our_output.svg"
@@ -261,11 +342,11 @@ class TestLayerOrderComparison:
 
         # Compare the two SVG files semantically using xmldiff
         try:
-            # Get diff between the two SVG files
-            diff_result = xmldiff_main.diff_files(
-                str(kicad_reference),
-                str(our_svg_file),
-                formatter=xmldiff_main.FORMATTERS["diff"](),
+            # Get diff between the two SVG files, each parsed exactly once
+            diff_result = xmldiff_main.diff_trees(
+                etree.parse(str(kicad_reference), DIFF_PARSER),
+                etree.parse(str(our_svg_file), DIFF_PARSER),
+                formatter=DIFF_FORMATTER,
             )
 
             # Filter out metadata differences (title, desc elements)
@@ -275,23 +356,9 @@ class TestLayerOrderComparison:
 
                 # Check if differences are only metadata-related
                 lines = diff_str.strip().split("\n")
-                non_metadata_diffs = []
-
-                for line in lines:
-                    # Skip differences related to title and desc elements
-                    # and their content
-                    is_metadata_diff = (
-                        "title]" in line
-                        or "desc]" in line
-                        or "update-text, /*/*[1]" in line  # title content
-                        or "update-text, /*/*[2]" in line  # desc content
-                        or (
-                            "move" in line and ("/*/*[1]" in line or "/*/*[12]" in line)
-                        )  # title/desc element moves
-                    )
-
-                    if not is_metadata_diff:
-                        non_metadata_diffs.append(line)
+                non_metadata_diffs = [
+                    line for line in lines if not METADATA_DIFF_RE.search(line)
+                ]
 
                 # If there are substantial non-metadata differences, fail the test
                 if non_metadata_diffs:
@@ -326,11 +393,8 @@ class TestErrorHandling:
         assert result.returncode != 0, "Should fail with invalid PCB file"
         assert "error" in result.stderr.lower() or "fail" in result.stderr.lower()
 
-    def test_invalid_layer_specification(
-        self, cli_runner, temp_output_dir, pcb_files_dir
-    ):
+    def test_invalid_layer_specification(self, cli_runner, temp_output_dir, pcb_files):
         """Test handling of invalid layer names."""
-        pcb_files = list(pcb_files_dir.glob("**/*.kicad_pcb"))
         if not pcb_files:
             pytest.skip("No PCB files available for testing")
 
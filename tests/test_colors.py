@@ -3,7 +3,10 @@
 # SPDX-License-Identifier: MIT
 """Comprehensive tests for colors.py module."""
 
+import io
 import json
+import os
+import xml.etree.ElementTree as ET
 
 import pytest
 
@@ -18,6 +21,7 @@ from kicad_svg_extras.colors import (
     net_name_to_css_class,
     parse_color,
     resolve_net_color,
+    resolve_net_colors,
     validate_hex_color,
 )
 
@@ -72,9 +76,14 @@ SVG_WITH_MIXED_RED_COLORS = """<?xml version="1.0"?>
 </svg>"""
 
 
-@pytest.fixture
-def svg_files(tmp_path):
-    """Create various SVG test files and return their paths."""
+@pytest.fixture(scope="session")
+def svg_files(tmp_path_factory):
+    """Create various SVG test files and return their paths.
+
+    Files are created once per session, tests only read them and write their
+    results to output_file.
+    """
+    tmp_path = tmp_path_factory.mktemp("svg_files")
     files = {}
 
     # Create different SVG files
@@ -161,8 +170,11 @@ class TestParseColor:
     )
     def test_valid_colors(self, input_color, expected):
         """Test parsing of valid color formats."""
-        result = parse_color(input_color)
-        assert result == expected
+        assert parse_color(input_color) == expected
+
+    def test_return_shape(self):
+        """Test that parsed color is a 7 character hex string."""
+        result = parse_color("rgba(255, 0, 0, 0.5)")
         assert isinstance(result, str)
         assert len(result) == 7
         assert result.startswith("#")
@@ -188,6 +200,7 @@ class TestParseColor:
             "rgb(255, 0, 0, 0)",  # Too many values
             "rgb(255.5, 0, 0)",  # Float values
             "rgb(a, b, c)",  # Non-numeric
+            "rgb(\uff12\uff15\uff15, 0, 0)",  # Non-ASCII (fullwidth) digits
             # Invalid named colors
             "redish",
             "not_a_color",
@@ -207,6 +220,11 @@ class TestParseColor:
         with pytest.raises(ColorError):
             parse_color(invalid_color)
 
+    def test_invalid_color_message_format(self):
+        """Test that error message names the invalid color."""
+        with pytest.raises(ColorError, match="Invalid color format: 'redish'"):
+            parse_color("redish")
+
     def test_whitespace_handling(self):
         """Test that whitespace is properly handled."""
         assert parse_color("  #FF0000  ") == "#FF0000"
@@ -247,6 +265,7 @@ class TestValidateHexColor:
             "",
             "red",
             "rgb(255,0,0)",
+            "#FF0000\n",  # Trailing newline
             None,
             123,
         ],
@@ -454,6 +473,37 @@ class TestResolveNetColor:
         assert resolve_net_color("DATA_OTHER", config) == "#FF0000"
 
 
+class TestResolveNetColors:
+    """Test resolve_net_colors function for resolving multiple nets at once."""
+
+    def test_matches_single_net_resolution(self):
+        """Test that result is the same as resolving each net separately."""
+        config = {
+            "GND": "#000001",
+            "DATA*": "#FF0000",
+            "DATA_BUS*": "#00FF00",
+            "CLK?": "#0000FF",
+        }
+        net_names = ["GND", "DATA0", "DATA_BUS1", "CLK1", "CLK12", "VCC"]
+
+        result = resolve_net_colors(net_names, config)
+
+        expected = {
+            net_name: resolve_net_color(net_name, config) for net_name in net_names
+        }
+        assert result == {k: v for k, v in expected.items() if v is not None}
+        assert "CLK12" not in result
+        assert "VCC" not in result
+
+    def test_empty_config(self):
+        """Test with empty configuration."""
+        assert resolve_net_colors(["GND", "VCC"], {}) == {}
+
+    def test_empty_nets(self):
+        """Test with empty net list."""
+        assert resolve_net_colors([], {"GND": "#FF0000"}) == {}
+
+
 class TestGroupNetsByColor:
     """Test group_nets_by_color function."""
 
@@ -544,7 +594,7 @@ class TestNetNameToCssClass:
 class TestFindCopperColorInSvg:
     """Test find_copper_color_in_svg function."""
 
-    def test_find_fill_attribute(self, tmp_path):
+    def test_find_fill_attribute(self):
         """Test finding color in fill attribute."""
         svg_content = """<?xml version="1.0"?>
         <svg xmlns="http://www.w3.org/2000/svg">
@@ -552,46 +602,35 @@ class TestFindCopperColorInSvg:
             <circle fill="#00FF00" r="5"/>
         </svg>"""
 
-        svg_file = tmp_path / "test.svg"
-        with open(svg_file, "w") as f:
-            f.write(svg_content)
-
-        result = find_copper_color_in_svg(svg_file)
+        result = find_copper_color_in_svg(io.StringIO(svg_content))
         # Should return first non-blacklisted color
         assert result in ["#FF0000", "#00FF00"]
 
-    def test_find_fill_in_style(self, tmp_path):
+    def test_find_fill_in_style(self):
         """Test finding color in style attribute."""
         svg_content = """<?xml version="1.0"?>
         <svg xmlns="http://www.w3.org/2000/svg">
             <rect style="fill:#123456; stroke:none" width="10" height="10"/>
         </svg>"""
 
-        svg_file = tmp_path / "test.svg"
-        with open(svg_file, "w") as f:
-            f.write(svg_content)
-
-        result = find_copper_color_in_svg(svg_file)
+        result = find_copper_color_in_svg(io.StringIO(svg_content))
         assert result == "#123456"
 
-    def test_ignore_blacklisted_colors(self, tmp_path):
+    def test_ignore_blacklisted_colors(self):
         """Test that blacklisted colors are ignored."""
         svg_content = """<?xml version="1.0"?>
         <svg xmlns="http://www.w3.org/2000/svg">
             <rect fill="#000000" width="10" height="10"/>
             <rect fill="#FFFFFF" width="10" height="10"/>
+            <rect fill="#ffffff" width="10" height="10"/>
             <rect fill="#FF0000" width="10" height="10"/>
         </svg>"""
 
-        svg_file = tmp_path / "test.svg"
-        with open(svg_file, "w") as f:
-            f.write(svg_content)
-
-        result = find_copper_color_in_svg(svg_file)
-        # Should skip black and white, return red
+        result = find_copper_color_in_svg(io.StringIO(svg_content))
+        # Should skip black and white (in any letter case), return red
         assert result == "#FF0000"
 
-    def test_no_color_found(self, tmp_path):
+    def test_no_color_found(self):
         """Test when no copper color is found."""
         svg_content = """<?xml version="1.0"?>
         <svg xmlns="http://www.w3.org/2000/svg">
@@ -599,11 +638,7 @@ class TestFindCopperColorInSvg:
             <rect fill="#FFFFFF" width="10" height="10"/>
         </svg>"""
 
-        svg_file = tmp_path / "test.svg"
-        with open(svg_file, "w") as f:
-            f.write(svg_content)
-
-        result = find_copper_color_in_svg(svg_file)
+        result = find_copper_color_in_svg(io.StringIO(svg_content))
         assert result is None
 
     def test_invalid_svg_file(self, tmp_path):
@@ -622,6 +657,17 @@ class TestFindCopperColorInSvg:
         result = find_copper_color_in_svg(svg_file)
         assert result is None
 
+    def test_same_size_rewrite_detected_again(self, tmp_path):
+        """Test that a rewritten file is checked again, even with same stat."""
+        svg_file = tmp_path / "test.svg"
+        svg_file.write_text('<svg><rect fill="#FF0000"/></svg>')
+        stat = svg_file.stat()
+        assert find_copper_color_in_svg(svg_file) == "#FF0000"
+
+        svg_file.write_text('<svg><rect fill="#00FF00"/></svg>')
+        os.utime(svg_file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        assert find_copper_color_in_svg(svg_file) == "#00FF00"
+
 
 class TestChangeSvgColor:
     """Test change_svg_color function."""
@@ -647,6 +693,48 @@ class TestChangeSvgColor:
         assert "rgb(255,0,0)" not in result_content
         assert "rgb(0,255,0)" in result_content
 
+    @pytest.mark.parametrize("chunk_size", [1, 5, 7, 16, 64 * 1024])
+    def test_replacement_across_chunk_boundaries(
+        self, tmp_path, output_file, monkeypatch, chunk_size
+    ):
+        """Test that colors split between read blocks are still replaced."""
+        monkeypatch.setattr(
+            "kicad_svg_extras.colors.COLOR_REPLACE_CHUNK_SIZE", chunk_size
+        )
+        svg_file = tmp_path / "input.svg"
+        svg_file.write_text(
+            '<svg><g style="fill:#FF0000"/><g fill="#ff0000"/>'
+            '<g stroke="rgb(255,0,0)"/><g fill="#Ff0000"/></svg>'
+        )
+
+        change_svg_color(svg_file, "#FF0000", "#00FF00", output_file)
+
+        assert output_file.read_text() == (
+            '<svg><g style="fill:#00FF00"/><g fill="#00ff00"/>'
+            '<g stroke="rgb(0,255,0)"/><g fill="#Ff0000"/></svg>'
+        )
+
+    def test_in_place_replacement(self, tmp_path):
+        """Test that input file can be used as output file."""
+        svg_file = tmp_path / "input.svg"
+        svg_file.write_text('<svg><g fill="#FF0000"/><g stroke="rgb(255,0,0)"/></svg>')
+
+        change_svg_color(svg_file, "#FF0000", "#00FF00", svg_file)
+
+        assert svg_file.read_text() == (
+            '<svg><g fill="#00FF00"/><g stroke="rgb(0,255,0)"/></svg>'
+        )
+
+    def test_string_paths(self, tmp_path):
+        """Test that file paths can be given as strings."""
+        svg_file = tmp_path / "input.svg"
+        svg_file.write_text('<svg><g fill="#FF0000"/></svg>')
+        output_file = tmp_path / "output.svg"
+
+        change_svg_color(str(svg_file), "#FF0000", "#00FF00", str(output_file))
+
+        assert output_file.read_text() == '<svg><g fill="#00FF00"/></svg>'
+
     def test_invalid_color_format(self, svg_files, output_file):
         """Test error handling for invalid color formats."""
         # Invalid old color
@@ -711,6 +799,31 @@ class TestApplyCssClassToSvg:
 
         assert result == expected
 
+    def test_given_current_color(self, tmp_path, output_file):
+        """Test that given current color is replaced instead of detected one."""
+        svg_file = tmp_path / "net.svg"
+        svg_file.write_text(
+            '<svg><desc/><g style="fill:#FF0000"/><g style="fill:#00FF00"/></svg>'
+        )
+
+        apply_css_class_to_svg(
+            svg_file, "VCC", "#0000FF", output_file, current_color="#00FF00"
+        )
+
+        result = output_file.read_text()
+        assert '<g style="fill:#FF0000"/>' in result
+        assert '<g style="" class="net-vcc"/>' in result
+
+    def test_no_copper_color_detected_in_place(self, svg_files, tmp_path):
+        """Test in-place output when no copper color is detected."""
+        expected = svg_files["no_copper"].read_text()
+        svg_file = tmp_path / "net.svg"
+        svg_file.write_text(expected)
+
+        apply_css_class_to_svg(svg_file, "VCC", "#FF0000", svg_file)
+
+        assert svg_file.read_text() == expected
+
     def test_invalid_color_format(self, svg_files, output_file):
         """Test error handling for invalid color format."""
         with pytest.raises(ColorError, match="Invalid color"):
@@ -718,26 +831,26 @@ class TestApplyCssClassToSvg:
                 svg_files["minimal"], "VCC", "invalid_color", output_file
             )
 
-    def test_css_class_name_generation(self, svg_files, output_file):
-        """Test CSS class name generation from various net names."""
-        # Test various net names
-        test_cases = [
+    @pytest.mark.parametrize(
+        "net_name,expected_class",
+        [
             ("VCC", "net-vcc"),
             ("GND", "net-gnd"),
             ("DATA_BUS", "net-data-bus"),
             ("CLK/RST", "net-clk-rst"),
             ("3V3", "net-net-3v3"),  # 3V3 starts with digit, gets "net-" prefix
-        ]
-
-        for net_name, expected_class in test_cases:
-            apply_css_class_to_svg(
-                svg_files["copper"], net_name, "#FF0000", output_file
-            )
+        ],
+    )
+    def test_css_class_name_generation(
+        self, svg_files, output_file, net_name, expected_class
+    ):
+        """Test CSS class name generation from various net names."""
+        apply_css_class_to_svg(svg_files["copper"], net_name, "#FF0000", output_file)
 
-            result = output_file.read_text()
+        result = output_file.read_text()
 
-            assert f".{expected_class}" in result
-            assert f'class="{expected_class}"' in result
+        assert f".{expected_class}" in result
+        assert f'class="{expected_class}"' in result
 
     def test_stroke_and_fill_replacement(self, svg_files, output_file):
         """Test replacement of both stroke and fill colors."""
@@ -757,6 +870,18 @@ class TestApplyCssClassToSvg:
         # Should have class
         assert 'class="net-vcc"' in result
 
+    def test_single_class_for_fill_and_stroke(self, svg_files, output_file):
+        """Test that style with both colors gets exactly one class attribute."""
+        apply_css_class_to_svg(
+            svg_files["copper_stroke"], "VCC", "#FF0000", output_file
+        )
+
+        result = output_file.read_text()
+
+        assert result.count('class="net-vcc"') == 1
+        # Duplicated attributes would make the output invalid XML
+        ET.fromstring(result)
+
     def test_file_write_error(self, svg_files, tmp_path):
         """Test error handling for file write errors."""
         # Create a directory with output file name to cause write error
@@ -781,6 +906,28 @@ class TestApplyColorToSvg:
         # Should not have old color
         assert "#B28C00" not in result
 
+    def test_in_place_color_application(self, svg_files, tmp_path):
+        """Test that input file can be used as output file."""
+        svg_file = tmp_path / "net.svg"
+        svg_file.write_text(svg_files["copper"].read_text())
+
+        apply_color_to_svg(svg_file, "#FF0000", svg_file)
+
+        result = svg_file.read_text()
+        assert "#FF0000" in result
+        assert "#B28C00" not in result
+
+    def test_given_current_color(self, tmp_path, output_file):
+        """Test that given current color is replaced instead of detected one."""
+        svg_file = tmp_path / "net.svg"
+        svg_file.write_text('<svg><g fill="#FF0000"/><g fill="#00FF00"/></svg>')
+
+        apply_color_to_svg(svg_file, "#0000FF", output_file, current_color="#00FF00")
+
+        assert output_file.read_text() == (
+            '<svg><g fill="#FF0000"/><g fill="#0000FF"/></svg>'
+        )
+
     def test_no_copper_color_detected(self, svg_files, output_file):
         """Test handling when no copper color is detected."""
         apply_color_to_svg(svg_files["no_copper"], "#FF0000", output_file)
@@ -791,6 +938,16 @@ class TestApplyColorToSvg:
 
         assert result == expected
 
+    def test_no_copper_color_detected_in_place(self, svg_files, tmp_path):
+        """Test in-place output when no copper color is detected."""
+        expected = svg_files["no_copper"].read_text()
+        svg_file = tmp_path / "net.svg"
+        svg_file.write_text(expected)
+
+        apply_color_to_svg(svg_file, "#FF0000", svg_file)
+
+        assert svg_file.read_text() == expected
+
     def test_invalid_color_format(self, svg_files, output_file):
         """Test error handling for invalid color format."""
         with pytest.raises(ColorError, match="Invalid net color"):
@@ -3,6 +3,8 @@
 # SPDX-License-Identifier: MIT
 """Tests for the layers module."""
 
+import dataclasses
+
 import pytest
 
 from kicad_svg_extras.layers import (
@@ -13,6 +15,7 @@ from kicad_svg_extras.layers import (
     get_non_copper_layers,
     is_copper_layer,
     parse_layer_list,
+    partition_copper_layers,
     validate_layers,
 )
 
@@ -35,6 +38,12 @@ class TestLayerInfo:
         layer = LayerInfo("Edge.Cuts", LayerType.EDGE_CUTS, False)
         assert layer.side == ""
 
+    def test_layer_info_immutable(self):
+        """Test that LayerInfo objects cannot be modified."""
+        layer = LayerInfo("F.Cu", LayerType.COPPER, True, "front")
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            layer.is_copper = False  # type: ignore[misc]
+
 
 class TestGetLayerInfo:
     """Test get_layer_info function."""
@@ -84,6 +93,7 @@ class TestGetLayerInfo:
         assert unknown.name == "Unknown.Layer"
         assert unknown.layer_type == LayerType.UNKNOWN
         assert unknown.is_copper is False
+        assert get_layer_info("Unknown.Layer") is unknown
 
 
 class TestIsCopperLayer:
@@ -146,6 +156,11 @@ class TestParseLayerList:
         result = parse_layer_list("F.Cu,,B.Cu,")
         assert result == ["F.Cu", "B.Cu"]
 
+    def test_parse_with_whitespace_only_elements(self):
+        """Test parsing with elements containing only whitespace."""
+        result = parse_layer_list(" F.Cu , ,\tB.Cu\n, ")
+        assert result == ["F.Cu", "B.Cu"]
+
 
 class TestValidateLayers:
     """Test validate_layers function."""
@@ -160,7 +175,7 @@ class TestValidateLayers:
         """Test validating unknown layers."""
         layers = ["F.Cu", "Unknown.Layer", "B.Cu", "Invalid.Layer"]
         invalid = validate_layers(layers)
-        assert set(invalid) == {"Unknown.Layer", "Invalid.Layer"}
+        assert invalid == ["Unknown.Layer", "Invalid.Layer"]
 
     def test_validate_mixed_layers(self):
         """Test validating mix of known and unknown layers."""
@@ -307,3 +322,18 @@ class TestLayerIntegration:
         # Continue workflow with valid layers
         copper_layers = get_copper_layers(valid_layers)
         assert copper_layers == ["F.Cu", "B.Cu"]
+
+
+class TestPartitionCopperLayers:
+    """Test partition_copper_layers function."""
+
+    def test_partition_mixed_layers(self):
+        """Test splitting mixed layers, preserving order."""
+        layers = ["F.Cu", "F.SilkS", "B.Cu", "Edge.Cuts", "In1.Cu"]
+        copper_layers, non_copper_layers = partition_copper_layers(layers)
+        assert copper_layers == ["F.Cu", "B.Cu", "In1.Cu"]
+        assert non_copper_layers == ["F.SilkS", "Edge.Cuts"]
+
+    def test_partition_empty_list(self):
+        """Test splitting empty list."""
+        assert partition_copper_layers([]) == ([], [])
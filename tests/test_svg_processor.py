@@ -12,10 +12,91 @@ from kicad_svg_extras.svg_processor import (
     extract_css_styles,
     merge_css_styles,
     merge_svg_files,
+    remove_empty_groups,
 )
 
 pytestmark = pytest.mark.unit
 
+SVG_NS = "http://www.w3.org/2000/svg"
+SVG_GROUP_TAG = f"{{{SVG_NS}}}g"
+SVG_RECT_TAG = f"{{{SVG_NS}}}rect"
+SVG_CIRCLE_TAG = f"{{{SVG_NS}}}circle"
+SVG_STYLE_TAG = f"{{{SVG_NS}}}style"
+
+# Paths of any group and any rect element (background rectangle)
+GROUP_PATH = f".//{SVG_GROUP_TAG}"
+RECT_PATH = f".//{SVG_RECT_TAG}"
+
+
+def make_svg(
+    content: str,
+    width: str = "100mm",
+    height: str = "100mm",
+    view_box: str = "0 0 100 100",
+) -> str:
+    """Build SVG document with given dimensions around given content.
+
+    Args:
+        content: Markup of root element children
+        width: Root element width attribute
+        height: Root element height attribute
+        view_box: Root element viewBox attribute
+
+    Returns:
+        SVG document as string
+    """
+    return (
+        '<?xml version="1.0"?>\n'
+        f'<svg width="{width}" height="{height}" viewBox="{view_box}">\n'
+        f"{content}\n"
+        "</svg>"
+    )
+
+
+# SVG files used as read-only inputs of merge_svg_files tests
+MERGE_INPUT_SVGS = {
+    "circle": make_svg('<g><circle r="5"/></g>'),
+    "wide_rect": make_svg(
+        '<g><rect width="10" height="10"/></g>', width="200mm", view_box="0 0 200 100"
+    ),
+    "red_circle": make_svg('<g fill="red"><circle cx="50" cy="50" r="5"/></g>'),
+    "blue_rect": make_svg(
+        '<g fill="blue"><rect x="10" y="10" width="10" height="10"/></g>'
+    ),
+    "clk_css": make_svg(
+        "<style>.net-clk { fill: #FF0000; }</style>\n"
+        '<g class="net-clk"><circle cx="50" cy="50" r="5"/></g>'
+    ),
+    "gnd_css": make_svg(
+        "<style>.net-gnd { fill: #00FF00; }</style>\n"
+        '<g class="net-gnd"><rect x="10" y="10" width="10" height="10"/></g>'
+    ),
+    "gray_base": make_svg(
+        '<g fill="gray"><rect x="0" y="0" width="100" height="100"/></g>'
+    ),
+    "red_circle_top_left": make_svg(
+        '<g fill="red"><circle cx="25" cy="25" r="5"/></g>'
+    ),
+    "blue_circle_bottom_right": make_svg(
+        '<g fill="blue"><circle cx="75" cy="75" r="5"/></g>'
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def merge_inputs(tmp_path_factory):
+    """Create merge_svg_files input files and return their paths.
+
+    Files are created once per module, tests only read them and write their
+    results to their own tmp_path.
+    """
+    tmp_path = tmp_path_factory.mktemp("merge_inputs")
+    files = {}
+    for name, content in MERGE_INPUT_SVGS.items():
+        files[name] = tmp_path / f"{name}.svg"
+        files[name].write_text(content)
+    return files
+
 
 def assert_valid_svg(svg_content: str) -> ET.Element:
     """Assert that the content is valid XML/SVG and return the root element.
@@ -158,13 +239,12 @@ class TestMergeCssStyles:
     def test_merge_multiple_styles(self, css_styles, expected_rules):
         """Test merging multiple CSS styles."""
         result = merge_css_styles(css_styles)
+        result_lines = [line.strip() for line in result.split("\n") if line.strip()]
 
-        # Verify all expected rules are present
-        for rule in expected_rules:
-            assert rule in result
+        # Verify all expected rules are present, each rule is on its own line
+        assert set(expected_rules) <= set(result_lines)
 
-        # Verify no duplicates (count newlines + 1 should equal expected rules)
-        result_lines = [line.strip() for line in result.split("\n") if line.strip()]
+        # Verify no duplicates (count of non-empty lines equals expected rules)
         assert len(result_lines) == len(expected_rules)
 
     def test_complex_css_rules(self):
@@ -207,176 +287,106 @@ class TestMergeSvgFiles:
         with pytest.raises(ValueError, match="No SVG files to merge"):
             merge_svg_files([], output_file)
 
-    def test_dimension_validation_mismatch(self, tmp_path):
+    def test_dimension_validation_mismatch(self, tmp_path, merge_inputs):
         """Test error when SVG files have mismatched dimensions."""
-        # Create two SVG files with different dimensions
-        svg1 = tmp_path / "file1.svg"
-        svg2 = tmp_path / "file2.svg"
         output_file = tmp_path / "output.svg"
 
-        svg1_content = """<?xml version="1.0"?>
-        <svg width="100mm" height="100mm" viewBox="0 0 100 100">
-            <g><circle r="5"/></g>
-        </svg>"""
-
-        svg2_content = """<?xml version="1.0"?>
-        <svg width="200mm" height="100mm" viewBox="0 0 200 100">
-            <g><rect width="10" height="10"/></g>
-        </svg>"""
-
-        with open(svg1, "w") as f:
-            f.write(svg1_content)
-        with open(svg2, "w") as f:
-            f.write(svg2_content)
-
+        # Merge two SVG files with different dimensions
         with pytest.raises(ValueError, match="SVG dimension mismatch"):
-            merge_svg_files([svg1, svg2], output_file)
+            merge_svg_files(
+                [merge_inputs["circle"], merge_inputs["wide_rect"]], output_file
+            )
 
-    def test_successful_merge_without_css(self, tmp_path):
+    def test_successful_merge_without_css(self, tmp_path, merge_inputs):
         """Test successful merging of SVG files without CSS."""
-        svg1 = tmp_path / "file1.svg"
-        svg2 = tmp_path / "file2.svg"
         output_file = tmp_path / "output.svg"
 
-        svg1_content = """<?xml version="1.0"?>
-        <svg width="100mm" height="100mm" viewBox="0 0 100 100">
-            <g fill="red"><circle cx="50" cy="50" r="5"/></g>
-        </svg>"""
-
-        svg2_content = """<?xml version="1.0"?>
-        <svg width="100mm" height="100mm" viewBox="0 0 100 100">
-            <g fill="blue"><rect x="10" y="10" width="10" height="10"/></g>
-        </svg>"""
-
-        with open(svg1, "w") as f:
-            f.write(svg1_content)
-        with open(svg2, "w") as f:
-            f.write(svg2_content)
-
-        merge_svg_files([svg1, svg2], output_file)
+        merge_svg_files(
+            [merge_inputs["red_circle"], merge_inputs["blue_rect"]], output_file
+        )
 
         # Verify output file exists and contains expected content
         assert output_file.exists()
 
-        with open(output_file) as f:
-            result = f.read()
+        result = output_file.read_text()
 
-        assert_valid_svg(result)
+        root = assert_valid_svg(result)
 
+        # Root element attributes are written as text, in fixed order
         assert 'width="100mm" height="100mm" viewBox="0 0 100 100"' in result
-        assert '<circle cx="50" cy="50" r="5"/>' in result
-        assert '<rect x="10" y="10" width="10" height="10"/>' in result
-        assert 'fill="red"' in result
-        assert 'fill="blue"' in result
 
-    def test_successful_merge_with_css(self, tmp_path):
+        # Content of both files is merged, check it on the parsed tree
+        groups = {group.get("fill"): group for group in root.iter(SVG_GROUP_TAG)}
+        circle = groups["red"].find(SVG_CIRCLE_TAG)
+        assert circle.attrib == {"cx": "50", "cy": "50", "r": "5"}
+        rect = groups["blue"].find(SVG_RECT_TAG)
+        assert rect.attrib == {"x": "10", "y": "10", "width": "10", "height": "10"}
+
+    def test_successful_merge_with_css(self, tmp_path, merge_inputs):
         """Test successful merging of SVG files with CSS styles."""
-        svg1 = tmp_path / "file1.svg"
-        svg2 = tmp_path / "file2.svg"
         output_file = tmp_path / "output.svg"
 
-        svg1_content = """<?xml version="1.0"?>
-        <svg width="100mm" height="100mm" viewBox="0 0 100 100">
-        <style>.net-clk { fill: #FF0000; }</style>
-        <g class="net-clk"><circle cx="50" cy="50" r="5"/></g>
-        </svg>"""
-
-        svg2_content = """<?xml version="1.0"?>
-        <svg width="100mm" height="100mm" viewBox="0 0 100 100">
-        <style>.net-gnd { fill: #00FF00; }</style>
-        <g class="net-gnd"><rect x="10" y="10" width="10" height="10"/></g>
-        </svg>"""
-
-        with open(svg1, "w") as f:
-            f.write(svg1_content)
-        with open(svg2, "w") as f:
-            f.write(svg2_content)
-
-        merge_svg_files([svg1, svg2], output_file)
+        merge_svg_files([merge_inputs["clk_css"], merge_inputs["gnd_css"]], output_file)
 
         # Verify output file contains merged CSS and content
-        with open(output_file) as f:
-            result = f.read()
+        root = assert_valid_svg(output_file.read_text())
 
-        assert_valid_svg(result)
+        style = root.find(SVG_STYLE_TAG)
+        assert style is not None
+        assert ".net-clk { fill: #FF0000; }" in style.text
+        assert ".net-gnd { fill: #00FF00; }" in style.text
 
-        assert "<style>" in result
-        assert ".net-clk { fill: #FF0000; }" in result
-        assert ".net-gnd { fill: #00FF00; }" in result
-        assert 'class="net-clk"' in result
-        assert 'class="net-gnd"' in result
+        classes = {group.get("class") for group in root.iter(SVG_GROUP_TAG)}
+        assert {"net-clk", "net-gnd"} <= classes
 
-    def test_merge_with_base_svg(self, tmp_path):
+    def test_merge_with_base_svg(self, tmp_path, merge_inputs):
         """Test merging with a base SVG file."""
-        base_svg = tmp_path / "base.svg"
-        svg1 = tmp_path / "file1.svg"
         output_file = tmp_path / "output.svg"
 
-        base_content = """<?xml version="1.0"?>
-        <svg width="100mm" height="100mm" viewBox="0 0 100 100">
-            <g fill="gray"><rect x="0" y="0" width="100" height="100"/></g>
-        </svg>"""
-
-        svg1_content = """<?xml version="1.0"?>
-        <svg width="100mm" height="100mm" viewBox="0 0 100 100">
-            <g fill="red"><circle cx="50" cy="50" r="5"/></g>
-        </svg>"""
-
-        with open(base_svg, "w") as f:
-            f.write(base_content)
-        with open(svg1, "w") as f:
-            f.write(svg1_content)
-
-        merge_svg_files([svg1], output_file, base_svg=base_svg)
+        merge_svg_files(
+            [merge_inputs["red_circle"]],
+            output_file,
+            base_svg=merge_inputs["gray_base"],
+        )
 
         # Verify base SVG dimensions are used for validation
         assert output_file.exists()
 
-        with open(output_file) as f:
-            result = f.read()
+        result = output_file.read_text()
 
-        assert_valid_svg(result)
+        root = assert_valid_svg(result)
 
         assert 'width="100mm" height="100mm" viewBox="0 0 100 100"' in result
-        assert '<circle cx="50" cy="50" r="5"/>' in result
+        circle = root.find(f".//{SVG_CIRCLE_TAG}")
+        assert circle.attrib == {"cx": "50", "cy": "50", "r": "5"}
 
-    def test_add_background_to_merged_svg(self, tmp_path):
+    def test_add_background_to_merged_svg(self, tmp_path, merge_inputs):
         """Test adding background to a merged SVG file."""
-        svg1 = tmp_path / "file1.svg"
-        svg2 = tmp_path / "file2.svg"
         output_file = tmp_path / "output.svg"
 
-        svg1_content = """<?xml version="1.0"?>
-        <svg width="100mm" height="100mm" viewBox="0 0 100 100">
-            <g fill="red"><circle cx="25" cy="25" r="5"/></g>
-        </svg>"""
-
-        svg2_content = """<?xml version="1.0"?>
-        <svg width="100mm" height="100mm" viewBox="0 0 100 100">
-            <g fill="blue"><circle cx="75" cy="75" r="5"/></g>
-        </svg>"""
-
-        with open(svg1, "w") as f:
-            f.write(svg1_content)
-        with open(svg2, "w") as f:
-            f.write(svg2_content)
-
         # First merge the SVGs
-        merge_svg_files([svg1, svg2], output_file)
+        merge_svg_files(
+            [
+                merge_inputs["red_circle_top_left"],
+                merge_inputs["blue_circle_bottom_right"],
+            ],
+            output_file,
+        )
 
         # Then add background to the merged result
         add_background_to_svg(output_file, "#282A36")
 
-        with open(output_file) as f:
-            result = f.read()
-
-        assert_valid_svg(result)
+        root = assert_valid_svg(output_file.read_text())
 
         # Should contain both circles and background
-        assert 'cx="25" cy="25" r="5"' in result
-        assert 'cx="75" cy="75" r="5"' in result
-        assert 'fill="#282A36"' in result
-        assert "<rect" in result
+        circles = {
+            (circle.get("cx"), circle.get("cy"), circle.get("r"))
+            for circle in root.iter(SVG_CIRCLE_TAG)
+        }
+        assert circles == {("25", "25", "5"), ("75", "75", "5")}
+        rect = root.find(RECT_PATH)
+        assert rect is not None
+        assert rect.get("fill") == "#282A36"
 
     def test_no_valid_files(self, tmp_path):
         """Test error when no valid SVG files are found."""
@@ -399,22 +409,15 @@ class TestAddBackgroundToSvg:
             <circle cx="50" cy="25" r="10"/>
         </svg>"""
 
-        with open(svg_file, "w") as f:
-            f.write(svg_content)
+        svg_file.write_text(svg_content)
 
         add_background_to_svg(svg_file, "#123456")
 
         # Read and validate the modified SVG
-        with open(svg_file) as f:
-            result = f.read()
-        root = assert_valid_svg(result)
-
-        # Parse the modified SVG for detailed validation
-        tree = ET.parse(svg_file)
-        root = tree.getroot()
+        root = assert_valid_svg(svg_file.read_text())
 
         # Find the background rectangle
-        rect = root.find(".//{http://www.w3.org/2000/svg}rect")
+        rect = root.find(RECT_PATH)
         assert rect is not None
         assert rect.attrib["x"] == "0.0"
         assert rect.attrib["y"] == "0.0"
@@ -431,22 +434,15 @@ class TestAddBackgroundToSvg:
             <circle cx="50" cy="25" r="10"/>
         </svg>"""
 
-        with open(svg_file, "w") as f:
-            f.write(svg_content)
+        svg_file.write_text(svg_content)
 
         add_background_to_svg(svg_file, "#ABCDEF")
 
         # Read and validate the modified SVG
-        with open(svg_file) as f:
-            result = f.read()
-        assert_valid_svg(result)
-
-        # Parse the modified SVG for detailed validation
-        tree = ET.parse(svg_file)
-        root = tree.getroot()
+        root = assert_valid_svg(svg_file.read_text())
 
         # Find the background rectangle
-        rect = root.find(".//{http://www.w3.org/2000/svg}rect")
+        rect = root.find(RECT_PATH)
         assert rect is not None
         assert rect.attrib["x"] == "0"
         assert rect.attrib["y"] == "0"
@@ -475,19 +471,13 @@ class TestAddBackgroundToSvg:
             <desc>Test SVG</desc>
         </svg>"""
 
-        with open(svg_file, "w") as f:
-            f.write(svg_content)
+        svg_file.write_text(svg_content)
 
         add_background_to_svg(svg_file, "#FF0000")
 
-        # Validate the modified SVG
-        with open(svg_file) as f:
-            result = f.read()
-        assert_valid_svg(result)
-
-        tree = ET.parse(svg_file)
-        root = tree.getroot()
-        rect = root.find(".//{http://www.w3.org/2000/svg}rect")
+        # Validate the modified SVG, parsing it once for all checks
+        root = assert_valid_svg(svg_file.read_text())
+        rect = root.find(RECT_PATH)
 
         assert rect.attrib["width"] == expected_width
         assert rect.attrib["height"] == expected_height
@@ -504,38 +494,20 @@ class TestAddBackgroundToSvg:
             </g>
         </svg>"""
 
-        with open(svg_file, "w") as f:
-            f.write(svg_content)
+        svg_file.write_text(svg_content)
 
         add_background_to_svg(svg_file, "#BACKGROUND")
 
         # Validate the modified SVG
-        with open(svg_file) as f:
-            result = f.read()
-        assert_valid_svg(result)
+        root = assert_valid_svg(svg_file.read_text())
 
-        tree = ET.parse(svg_file)
-        root = tree.getroot()
-
-        # Get all children to check order
-        children = list(root)
-
-        # Find indices of key elements
-        title_idx = next(
-            i for i, child in enumerate(children) if child.tag.endswith("title")
-        )
-        desc_idx = next(
-            i for i, child in enumerate(children) if child.tag.endswith("desc")
-        )
-        rect_idx = next(
-            i for i, child in enumerate(children) if child.tag.endswith("rect")
-        )
-        group_idx = next(
-            i for i, child in enumerate(children) if child.tag.endswith("g")
-        )
+        # Index of first child element with each local (namespace-less) tag name
+        indices = {}
+        for i, child in enumerate(root):
+            indices.setdefault(child.tag.rpartition("}")[2], i)
 
         # Background rect should be right after desc and before other content
-        assert title_idx < desc_idx < rect_idx < group_idx
+        assert indices["title"] < indices["desc"] < indices["rect"] < indices["g"]
 
     def test_fallback_dimensions(self, tmp_path):
         """Test fallback behavior when no viewBox or valid dimensions."""
@@ -545,19 +517,13 @@ class TestAddBackgroundToSvg:
             <desc>Test SVG</desc>
         </svg>"""
 
-        with open(svg_file, "w") as f:
-            f.write(svg_content)
+        svg_file.write_text(svg_content)
 
         add_background_to_svg(svg_file, "#DEFAULT")
 
         # Validate the modified SVG
-        with open(svg_file) as f:
-            result = f.read()
-        assert_valid_svg(result)
-
-        tree = ET.parse(svg_file)
-        root = tree.getroot()
-        rect = root.find(".//{http://www.w3.org/2000/svg}rect")
+        root = assert_valid_svg(svg_file.read_text())
+        rect = root.find(RECT_PATH)
 
         # Should use fallback dimensions
         assert rect.attrib["width"] == "100.0"
@@ -572,20 +538,52 @@ class TestAddBackgroundToSvg:
             <circle cx="50" cy="25" r="10"/>
         </svg>"""
 
-        with open(svg_file, "w") as f:
-            f.write(svg_content)
+        svg_file.write_text(svg_content)
 
         # Should not raise error, but also should not add background
         add_background_to_svg(svg_file, "#123456")
 
         # Validate the SVG is still valid
-        with open(svg_file) as f:
-            result = f.read()
-        assert_valid_svg(result)
-
-        tree = ET.parse(svg_file)
-        root = tree.getroot()
+        root = assert_valid_svg(svg_file.read_text())
 
         # Should not have added a rectangle
-        rect = root.find(".//{http://www.w3.org/2000/svg}rect")
+        rect = root.find(RECT_PATH)
         assert rect is None
+
+
+class TestRemoveEmptyGroups:
+    """Test remove_empty_groups function."""
+
+    def test_remove_top_level_empty_groups(self, tmp_path):
+        """Test that empty groups are removed and non-empty ones kept."""
+        svg_file = tmp_path / "test.svg"
+        svg_file.write_text(
+            '<svg xmlns="http://www.w3.org/2000/svg">'
+            "<g/><g><circle/></g><g></g><rect/>"
+            "</svg>"
+        )
+
+        remove_empty_groups(svg_file)
+
+        root = assert_valid_svg(svg_file.read_text())
+        groups = root.findall(SVG_GROUP_TAG)
+        assert len(groups) == 1
+        assert groups[0].find(SVG_CIRCLE_TAG) is not None
+        assert root.find(SVG_RECT_TAG) is not None
+
+    def test_remove_nested_empty_groups(self, tmp_path):
+        """Test that groups left empty after removing their children go too."""
+        svg_file = tmp_path / "test.svg"
+        svg_file.write_text(
+            '<svg xmlns="http://www.w3.org/2000/svg">'
+            "<g><g/><g><g/></g></g>"
+            '<g id="kept"><g/><path/></g>'
+            "</svg>"
+        )
+
+        remove_empty_groups(svg_file)
+
+        root = assert_valid_svg(svg_file.read_text())
+        groups = root.findall(GROUP_PATH)
+        assert [g.get("id") for g in groups] == ["kept"]
+        assert len(groups[0]) == 1